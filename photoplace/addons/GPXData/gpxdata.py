@@ -382,10 +382,10 @@ class GPXData(Plugin):
             foto_path = os.path.dirname(photo.path)
             foto_path = os.path.split(foto_path)[1]
             if not tracks.has_key(foto_path):
-                gpxtrkseg = pyGPX.GPXSegment(foto_path)
-                tracks[foto_path] = gpxtrkseg
+                points = list()
+                tracks[foto_path] = points
             else:
-                gpxtrkseg = tracks[foto_path]
+                points = tracks[foto_path]
             if photo.isGeoLocated():
                 dgettext['photo'] = photo.name
                 dgettext['photo_lon'] = photo.lon
@@ -398,9 +398,10 @@ class GPXData(Plugin):
                 msg = _("Generated WayPoint from '%(photo)s' at %(photo_time)s (UTC=%(photo_tutc)s) "
                     "with coordinates (lon=%(photo_lon).8f, lat=%(photo_lat).8f, ele=%(photo_ele).8f).")
                 self.logger.debug(msg % dgettext)
-                gpxtrkseg.addPoint(gpxwpt)
+                points.append(gpxwpt)
         proc_photos = 0
-        for name, gpxtrkseg in tracks.iteritems():
+        for name, points in tracks.iteritems():
+            gpxtrkseg = pyGPX.GPXSegment.fromPoints(name, points)
             dgettext['track_name'] = name
             gpxtrk = pyGPX.GPXTrack(name)
             gpxtrk.status = True
@@ -73,7 +73,8 @@ class DoTemplates(Interface.Action):
                 self.state._templateseparatornodes,
                 self.state._templatedefaultvalue,
                 self.state._templateseparatorkey,
-                self.state._templatedeltag)
+                self.state._templatedeltag,
+                self.state['streamkml'] > 0)
         except kmlData.KmlDataError as kmldataerror:
             msg = str(kmldataerror)
             self.logger.error(msg)
@@ -27,18 +27,40 @@ __copyright__ ="(c) Jose Riguera"
 
 import threading
 import datetime
+import heapq
+import itertools
+
+import pyGPX
 
 import Interface
+from PhotoPlace.Facade import Error
 from PhotoPlace.definitions import *
 
 
 
 class Geolocate(Interface.Action, threading.Thread):
 
-    def __init__(self, state):
+    def __init__(self, state, mode=PhotoPlace_Cfg_main_geolocatemode,
+        interpolate=PhotoPlace_Cfg_main_interpolatemode):
         Interface.Action.__init__(self, state, 
             [state.lock_geophotos, state.lock_gpxdata])
         threading.Thread.__init__(self)
+        if not mode in PhotoPlace_Cfg_GeolocateModes:
+            self.dgettext['mode'] = mode
+            msg = _("Unknown geolocation mode '%(mode)s'.") % self.dgettext
+            self.logger.error(msg)
+            tip = _("Valid modes are: %s.") % PhotoPlace_Cfg_GeolocateModes
+            raise Error(msg, tip, "ValueError")
+        if not interpolate in PhotoPlace_Cfg_InterpolateModes:
+            self.dgettext['interpolate'] = interpolate
+            msg = _("Unknown interpolation mode '%(interpolate)s'.") % self.dgettext
+            self.logger.error(msg)
+            tip = _("Valid modes are: %s.") % PhotoPlace_Cfg_InterpolateModes
+            raise Error(msg, tip, "ValueError")
+        self.mode = mode
+        self.dgettext['mode'] = PhotoPlace_Cfg_GeolocateModes[mode]
+        self.interpolate = interpolate
+        self.dgettext['interpolate'] = PhotoPlace_Cfg_InterpolateModes[interpolate]
         self.geophotos = state.geophotos
         self.gpxdata = state.gpxdata
         self.tzdiff = state.tzdiff
@@ -52,17 +74,116 @@ class Geolocate(Interface.Action, threading.Thread):
         self._notify_ini(self.maxdeltaseconds, self.forcegeolocation)
         self.dgettext['maxdeltaseconds'] = self.maxdeltaseconds
         self.dgettext['timezone'] = self.tzdiff
-        msg = _("Geotagging mode <%(exifmode)s>, diff from UTC %(timezone)s "
-            "and delta of %(maxdeltaseconds)s seconds ...") % self.dgettext
+        msg = _("Geotagging mode <%(exifmode)s> (%(mode)s, %(interpolate)s), diff "
+            "from UTC %(timezone)s and delta of %(maxdeltaseconds)s seconds ...") % self.dgettext
         self.logger.info(msg)
         return self.geolocated
 
 
+    def _search(self, photo_tutc, max_delta):
+        tracksegs = list()
+        for track in self.gpxdata.tracks:
+            if not track.status:
+                continue
+            tracksegs += track.closest(photo_tutc, max_delta)
+        if len(tracksegs) == 0:
+            return (None, None, None)
+        min_tdiff = datetime.timedelta.max
+        closed_point = None
+        bracket = None
+        for tragseg in tracksegs:
+            (prev_point, next_point) = tragseg.bracket(photo_tutc)
+            for point in (prev_point, next_point):
+                delta = abs(point.time - photo_tutc)
+                if delta < min_tdiff:
+                    min_tdiff = delta
+                    closed_point = point
+                    bracket = (prev_point, next_point)
+        return (closed_point, min_tdiff, bracket)
+
+
+    def _trackpoints(self):
+        # All points of the active tracks in a single time ordered stream
+        # of (seconds, segment, position, point) tuples. Segments are in
+        # self._segments by their number in the stream.
+        streams = list()
+        self._segments = list()
+        for track in self.gpxdata.tracks:
+            if not track.status:
+                continue
+            for trkseg in track.ltrkseg:
+                stream = itertools.izip(trkseg.timeIndex(),
+                    itertools.repeat(len(streams)), itertools.count(), trkseg.lwpts)
+                streams.append(stream)
+                self._segments.append((trkseg, len(trkseg.lwpts)))
+        return heapq.merge(*streams)
+
+
+    def _merge(self, photo_tutc, max_delta):
+        # Photos are time ordered, so the trackpoints stream only goes forward
+        seconds = pyGPX.timeToSeconds(photo_tutc)
+        while self._next_point != None and self._next_point[0] <= seconds:
+            self._prev_point = self._next_point
+            (point_seconds, segment, pos, point) = self._prev_point
+            # segments with points before and after the current time
+            if pos + 1 < self._segments[segment][1]:
+                self._open[segment] = self._prev_point
+            else:
+                self._open.pop(segment, None)
+            self._next_point = next(self._points, None)
+        min_tdiff = datetime.timedelta.max
+        closed = None
+        for candidate in (self._prev_point, self._next_point):
+            if candidate != None:
+                delta = abs(candidate[3].time - photo_tutc)
+                if delta < min_tdiff:
+                    min_tdiff = delta
+                    closed = candidate
+        if closed is None or min_tdiff > max_delta:
+            return (None, None, None)
+        # Interpolation is between points of a segment containing the time
+        # of the photo (overlapping tracks): the one of the closest point,
+        # otherwise the one with the shortest interval.
+        bracket = None
+        span = None
+        for (segment, prev_point) in self._open.iteritems():
+            next_point = self._segments[segment][0].lwpts[prev_point[2] + 1]
+            if segment == closed[1]:
+                bracket = (prev_point[3], next_point)
+                break
+            if span is None or next_point.time - prev_point[3].time < span:
+                span = next_point.time - prev_point[3].time
+                bracket = (prev_point[3], next_point)
+        return (closed[3], min_tdiff, bracket)
+
+
+    def _interpolate(self, photo_tutc, max_delta, bracket):
+        if bracket == None:
+            return None
+        (prev_point, next_point) = bracket
+        if not (prev_point.time < photo_tutc < next_point.time):
+            return None
+        if photo_tutc - prev_point.time > max_delta \
+            or next_point.time - photo_tutc > max_delta:
+            return None
+        return pyGPX.interpolatePoint(prev_point, next_point,
+            photo_tutc, self.interpolate == 2)
+
+
     def go(self, rini):
         self.photo_counter = len(self.geolocated)
         max_delta = datetime.timedelta(seconds=self.maxdeltaseconds)
         self.dgettext['time_delta'] = max_delta
-        for photo in self.geophotos:
+        geophotos = self.geophotos
+        locate = self._search
+        if self.mode == 1:
+            geophotos = sorted(self.geophotos, key=lambda photo: photo.time)
+            self._points = self._trackpoints()
+            self._prev_point = None
+            self._next_point = next(self._points, None)
+            self._open = dict()
+            locate = self._merge
+        for photo in geophotos:
             self._notify_run(photo, 0)
             if photo.status < self.state.status:
                 continue
@@ -86,25 +207,13 @@ class Geolocate(Interface.Action, threading.Thread):
                     #self._notify_run(photo, 1)
                     self._notify_run(photo, -1)
                     continue
-            tracksegs = list()
-            for track in self.gpxdata.tracks:
-                if not track.status:
-                    continue
-                tracksegs += track.closest(photo_tutc, max_delta)
-            if len(tracksegs) == 0:
+            (closed_point, min_tdiff, bracket) = locate(photo_tutc, max_delta)
+            if closed_point is None:
                 self.logger.warning(_("It is impossible geotag '%(photo)s' "
                     "taken at %(photo_time)s (UTC=%(photo_tutc)s) with time "
                     "delta %(time_delta)s. No closed points.") % self.dgettext)
                 self._notify_run(photo, -2)
             else:
-                min_tdiff = datetime.timedelta.max
-                closed_point = None
-                for tragseg in tracksegs:
-                    point = tragseg.closest(photo_tutc)
-                    delta = abs(point.time - photo_tutc)
-                    if delta < min_tdiff:
-                        min_tdiff = delta
-                        closed_point = point
                 self.dgettext['point_time'] = closed_point.time
                 if min_tdiff > max_delta:
                     self.logger.warning(_("It is impossible geotag '%(photo)s' "
@@ -113,6 +222,11 @@ class Geolocate(Interface.Action, threading.Thread):
                         "(time=%(point_time)s).") % self.dgettext)
                     self._notify_run(photo, -3)
                 else:
+                    if self.interpolate:
+                        point = self._interpolate(photo_tutc, max_delta, bracket)
+                        if point is not None:
+                            closed_point = point
+                            min_tdiff = datetime.timedelta()
                     photo.lat = closed_point.lat
                     photo.lon = closed_point.lon
                     photo.ele = closed_point.ele
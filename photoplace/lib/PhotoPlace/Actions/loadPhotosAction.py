@@ -29,9 +29,12 @@ import os.path
 import threading
 import datetime
 import re
+import heapq
+import multiprocessing.pool
 
 import Interface
 from PhotoPlace.DataTypes import geoPhotoData
+from PhotoPlace.DataTypes import exifCache
 from PhotoPlace.Facade import Error
 from PhotoPlace.definitions import *
 
@@ -46,6 +49,9 @@ class LoadPhotos(Interface.Action, threading.Thread):
         self.dgettext['photoinputdir'] = self.photoinputdir  #.encode(PLATFORMENCODING)
         self.allowed_names = PhotoPlace_Cfg_PhotoRegExp.search
         self.toffset = state['timeoffsetseconds']
+        self.workers = state['loadworkers']
+        self.lazyexif = bool(state['lazyexif'])
+        self.cache = None
         self.num_photos = 0
         try:
             self.listphotoinputdir = os.listdir(self.photoinputdir)
@@ -67,18 +73,61 @@ class LoadPhotos(Interface.Action, threading.Thread):
         return self.state.geophotos
 
 
+    def _openCache(self):
+        if not self.state.resourcedir_user:
+            return None
+        filename = os.path.join(self.state.resourcedir_user, PhotoPlace_Cfg_ExifCacheFile)
+        try:
+            return exifCache.ExifCache(filename)
+        except exifCache.ExifCacheError as e:
+            self.logger.warning(str(e))
+        return None
+
+
+    def _load(self, fname):
+        # It runs in the workers, exceptions are returned to go()
+        filename = os.path.join(self.photoinputdir, fname)
+        name = re.sub(r"\s+", '_', fname.lower())
+        #name = re.sub(r"\s+", '_', fname)
+        try:
+            data = None
+            if self.cache != None:
+                data = self.cache.get(filename)
+            if data != None:
+                # Exif data from cache, pyexiv2 is not used
+                geophoto = geoPhotoData.GeoPhoto(filename, name,
+                    loadexif=False, lazyexif=True)
+                geophoto.setExifData(data)
+            else:
+                # In lazy mode, only time, GPS and orientation are kept in memory
+                geophoto = geoPhotoData.GeoPhoto(filename, name, lazyexif=self.lazyexif)
+                if self.cache != None:
+                    self.cache.put(filename, geophoto.getExifData())
+        except Exception as e:
+            return (filename, None, e)
+        return (filename, geophoto, None)
+
+
     def go(self, rini):
         self.num_photos = 0
-        for fname in self.listphotoinputdir:
-            if self.allowed_names(fname):
-                filename = os.path.join(self.photoinputdir, fname)
+        loaded = []
+        fnames = [fname for fname in self.listphotoinputdir if self.allowed_names(fname)]
+        pool = None
+        if self.lazyexif:
+            # Without lazy mode all the metadata is read, there is nothing to save
+            self.cache = self._openCache()
+        if self.workers > 1 and len(fnames) > 1:
+            # Reading exif is mostly waiting for I/O, threads are enough.
+            # Results come in directory order, as in serial mode.
+            pool = multiprocessing.pool.ThreadPool(self.workers)
+            results = pool.imap(self._load, fnames)
+        else:
+            results = (self._load(fname) for fname in fnames)
+        try:
+            for (filename, geophoto, error) in results:
                 self.dgettext['photo'] = filename  #.encode(PLATFORMENCODING)
-                try:
-                    #geophoto = geoPhotoData.GeoPhoto(filename, re.sub(r"\s+", '_', fname))
-                    geophoto = geoPhotoData.GeoPhoto(filename, re.sub(r"\s+", '_', fname.lower()))
-                    #geophoto = geoPhotoData.GeoPhoto(filename, fname)
-                except Exception as e:
-                    self.dgettext['error'] = str(e)
+                if error != None:
+                    self.dgettext['error'] = str(error)
                     msg = _("Error processing photo '%(photo)s': %(error)s.")
                 else:
                     geophoto.status = 1
@@ -86,20 +135,41 @@ class LoadPhotos(Interface.Action, threading.Thread):
                     geophoto.time = geophoto.time + datetime.timedelta(seconds=offset)
                     geophoto.toffset = -self.toffset
                     self._notify_run(geophoto)
-                    position = 0
-                    for photo in self.state.geophotos:
-                        if geophoto.time <= photo.time:
-                            self.state.geophotos.insert(position, geophoto)
-                            break
-                        position += 1
-                    else:
-                        self.state.geophotos.append(geophoto)
+                    loaded.append(geophoto)
                     self.num_photos += 1
                     msg = _("Photo file name '%(photo)s' was processed properly.")
                 self.logger.debug(msg % self.dgettext)
+        finally:
+            if pool != None:
+                pool.terminate()
+                pool.join()
+            if self.cache != None:
+                self.dgettext['cache_hits'] = self.cache.hits
+                self.dgettext['cache_misses'] = self.cache.misses
+                msg = _("Exif cache: %(cache_hits)s hits, %(cache_misses)s misses.")
+                self.logger.debug(msg % self.dgettext)
+                self.cache.close()
+                self.cache = None
+            self._merge(loaded)
         return self.state.geophotos
 
 
+    def _merge(self, loaded):
+        # Sort the new photos once and merge them with the current ones.
+        # Photos with the same time go in reverse load order and before
+        # the current ones, like inserting one by one before the first
+        # photo with time greater or equal.
+        loaded.reverse()
+        loaded.sort(key=lambda photo: photo.time)
+        current = self.state.geophotos
+        if not current:
+            current.extend(loaded)
+        else:
+            new = ((photo.time, 0, pos, photo) for pos, photo in enumerate(loaded))
+            old = ((photo.time, 1, pos, photo) for pos, photo in enumerate(current))
+            current[:] = [item[3] for item in heapq.merge(new, old)]
+
+
     def end(self, rgo):
         self._notify_end(self.num_photos)
         self.dgettext['num_photos'] = self.num_photos
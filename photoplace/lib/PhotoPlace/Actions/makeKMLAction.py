@@ -25,12 +25,17 @@ __license__ = "Apache 2.0"
 __copyright__ ="(c) Jose Riguera"
 
 
+import os.path
 import threading
 import datetime
+import functools
+import re
 
 import pyGPX
 
 import Interface
+from PhotoPlace.DataTypes import geoPhotoData
+from PhotoPlace.DataTypes import exifCache
 from PhotoPlace.definitions import *
 
 
@@ -49,6 +54,8 @@ class MakeKML(Interface.Action, threading.Thread):
         self.tzdiff = state.tzdiff
         self.stzdiff = state.stzdiff
         self.uri_mode = 0
+        self.exifkeys = []
+        self.newtags = []
         self.rootdata = dict(rootdata)
 
 
@@ -85,18 +92,17 @@ class MakeKML(Interface.Action, threading.Thread):
                         max_time = tmax
                     (lmin, lmax, length) = track.lengthMinMaxTotal()
                     total_length += length
-                    points = track.listpoints()
-                    for point in points:
-                        num_points += 1
-                        if max_lat < point.lat:
-                            max_lat = point.lat
-                        if min_lat > point.lat:
-                            min_lat = point.lat
-                        if max_lon < point.lon:
-                            max_lon = point.lon
-                        if min_lon > point.lon:
-                            min_lon = point.lon
-                    points = None
+                    for trkseg in track.ltrkseg:
+                        num_points += len(trkseg.lwpts)
+                        ((smin_lat, smin_lon), (smax_lat, smax_lon)) = trkseg.coordMinMax()
+                        if max_lat < smax_lat:
+                            max_lat = smax_lat
+                        if min_lat > smin_lat:
+                            min_lat = smin_lat
+                        if max_lon < smax_lon:
+                            max_lon = smax_lon
+                        if min_lon > smin_lon:
+                            min_lon = smin_lon
                     num_tracks += 1
                 except Exception as e:
                     self.dgettext['error'] = str(e)
@@ -173,6 +179,15 @@ class MakeKML(Interface.Action, threading.Thread):
             self.uri_mode = 2
         else:
             self.uri_mode = 0
+        # Only the Exif tags used by the templates (and photo URI) are
+        # exported, the rest are read if other templates use them.
+        kmldata = self.state.kmldata
+        variables = kmldata.photo_variables + kmldata.getVariables(kmldata.layout_file)
+        variables += re.findall(r"%\(([a-zA-Z0-9_\.]+)", self.photouri)
+        self.exifkeys = []
+        for variable in variables:
+            if variable.startswith(PhotoPlace_ExifPREFIX) and not variable in self.exifkeys:
+                self.exifkeys.append(variable)
         self.logger.info(_("Generating KML from photos' geodata ..."))
         msg = _("Generating KML from photos with options: <%s>.") % self.dgettext
         self.logger.debug(msg)
@@ -181,6 +196,7 @@ class MakeKML(Interface.Action, threading.Thread):
 
     def go(self, rini):
         photodata = dict()
+        self.newtags = []
         for photo in self.state.geophotos:
             self._notify_run(photo, 0)
             if photo.status < self.state.status:
@@ -205,11 +221,11 @@ class MakeKML(Interface.Action, threading.Thread):
                 photodata[PhotoPlace_ResourceURI] = self.photouri  #.encode(PLATFORMENCODING)
                 photo_tutc = photo.time - self.tzdiff
                 photodata[PhotoPlace_PhotoUTCDATE] = photo_tutc.strftime("%Y-%m-%dT%H:%M:%S") + self.stzdiff
-                for k in photo.exif.exif_keys:
-                    try:
-                        photodata[k] = str(photo.exif[k].value)
-                    except:
-                        pass
+                num_tags = len(photo.exiftags or ())
+                try:
+                    photodata.update(photo.getExifTags(self.exifkeys))
+                except geoPhotoData.GeoPhotoError as e:
+                    self.logger.warning(str(e))
                 if self.uri_mode == 1:
                     photodata[PhotoPlace_PhotoURI] = self.photouri % photodata
                 elif self.uri_mode == 2:
@@ -222,7 +238,11 @@ class MakeKML(Interface.Action, threading.Thread):
                 if photo.path in self.state.geophotostyle:
                     tmptemplates = self.state.geophotostyle[photo.path]
                 # data to template.
-                self.state.kmldata.setData(photodata, tmptemplates)
+                self.state.kmldata.setData(photodata, tmptemplates,
+                    functools.partial(self._exifTag, photo))
+                if photo.lazyexif and len(photo.exiftags or ()) > num_tags:
+                    # Tags read from the file, for the Exif cache
+                    self.newtags.append(photo)
                 self._notify_run(photo, 1)
                 msg = _("Photo '%(photo)s' was processed for KML data")
                 self.logger.debug(msg % self.dgettext)
@@ -234,7 +254,47 @@ class MakeKML(Interface.Action, threading.Thread):
         return self.state.kmldata
 
 
+    def _exifTag(self, photo, key):
+        # Exif tags not exported, only if a template uses them
+        if not key.startswith(PhotoPlace_ExifPREFIX) or key in self.exifkeys:
+            # exported tags were already asked
+            raise KeyError(key)
+        try:
+            return photo.getExifTag(key)
+        except geoPhotoData.GeoPhotoError as e:
+            self.logger.warning(str(e))
+            raise KeyError(key)
+
+
+    def _updateCache(self):
+        # Exif tags read from the files are stored in the cache of
+        # LoadPhotos, the next time they will not be read again.
+        if not self.newtags or not self.state.resourcedir_user:
+            return
+        filename = os.path.join(self.state.resourcedir_user, PhotoPlace_Cfg_ExifCacheFile)
+        try:
+            cache = exifCache.ExifCache(filename)
+        except exifCache.ExifCacheError as e:
+            self.logger.warning(str(e))
+            return
+        try:
+            for photo in self.newtags:
+                try:
+                    cache.putTags(photo.path, photo.exiftags)
+                except OSError:
+                    # file removed
+                    pass
+        except Exception as e:
+            self.dgettext['error'] = str(e)
+            msg = _("Cannot update Exif cache: %(error)s.")
+            self.logger.warning(msg % self.dgettext)
+        finally:
+            cache.close()
+        self.newtags = []
+
+
     def end(self, rgo):
+        self._updateCache()
         self.state.kmldata.close(self.rootdata)
         self.rootdata = None
         self._notify_end(self.num_photos)
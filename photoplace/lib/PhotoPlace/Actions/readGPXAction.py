@@ -45,6 +45,10 @@ class ReadGPX(Interface.Action, threading.Thread):
         Interface.Action.__init__(self, state, [state.lock_gpxdata])
         threading.Thread.__init__(self)
         self.gpxinputfile = state['gpxinputfile']
+        # Only coordinates and time of trackpoints are used
+        self.profile = pyGPX.GPXParser_PROFILE_GEOMETRY
+        if state['compactgpx'] > 0:
+            self.profile = pyGPX.GPXParser_PROFILE_COMPACT
         self.dgettext['gpxinputfile'] = self.gpxinputfile  #.encode(PLATFORMENCODING)
         try:
             try:
@@ -78,7 +82,8 @@ class ReadGPX(Interface.Action, threading.Thread):
 
     def go(self, rini):
         try:
-            gpxparser = pyGPX.GPXParser(self.fd, os.path.basename(self.gpxinputfile))
+            gpxparser = pyGPX.GPXParser(self.fd, os.path.basename(self.gpxinputfile),
+                datetime.timedelta(), self.profile)
             #    os.path.basename(self.gpxinputfile), self.utc_time_delta)
             self._notify_run(gpxparser)
         except Exception as exception:
@@ -31,13 +31,85 @@ import datetime
 import zipfile
 import zlib
 import shutil
+import multiprocessing
+import json
+import hashlib
 
 import Interface
+from PhotoPlace.DataTypes import geoPhotoData
 from PhotoPlace.Facade import Error
 from PhotoPlace.definitions import *
 
 
 
+class _ZlibLevel(object):
+    """
+    zlib for zipfile, it deflates with a compression level instead of the
+    default one.
+    """
+    def __init__(self, level):
+        self.level = level
+
+
+    def __getattr__(self, name):
+        return getattr(zlib, name)
+
+
+    def compressobj(self, level=zlib.Z_DEFAULT_COMPRESSION, *args):
+        return zlib.compressobj(self.level, *args)
+
+
+
+class _KmzFile(zipfile.ZipFile):
+    """
+    ZipFile which deflates the entries with a compression level, zipfile
+    always uses the default level of zlib. Its zlib is replaced while an
+    entry is written.
+    """
+    _lock = threading.Lock()
+
+    def __init__(self, file, mode="r", level=zlib.Z_DEFAULT_COMPRESSION):
+        zipfile.ZipFile.__init__(self, file, mode)
+        self.zlib = _ZlibLevel(level)
+
+
+    def _deflate(self, method, *args):
+        _KmzFile._lock.acquire()
+        try:
+            zipfile.zlib = self.zlib
+            method(self, *args)
+        finally:
+            zipfile.zlib = zlib
+            _KmzFile._lock.release()
+
+
+    def write(self, filename, arcname=None, compress_type=None):
+        self._deflate(zipfile.ZipFile.write, filename, arcname, compress_type)
+
+
+    def writestr(self, zinfo_or_arcname, data, compress_type=None):
+        self._deflate(zipfile.ZipFile.writestr, zinfo_or_arcname, data, compress_type)
+
+
+
+def _copy(job):
+    # It runs in a worker process, only simple data is passed to it.
+    # Returns (jpeg data, error), data only if there is no new_file.
+    (path, name, new_file, data, geolocated, zoom, size, quality) = job
+    try:
+        photo = geoPhotoData.GeoPhoto(path, name, loadexif=False, lazyexif=True)
+        photo.setExifData(data)
+        if geolocated:
+            photo.attrToExif()
+        if new_file == None:
+            return (photo.copyData(True, zoom, size, quality), None)
+        photo.copy(new_file, True, zoom, size, quality)
+    except Exception as e:
+        return (None, str(e))
+    return (None, None)
+
+
+
 class SaveFiles(Interface.Action, threading.Thread):
 
     def __init__(self, state):
@@ -56,14 +128,37 @@ class SaveFiles(Interface.Action, threading.Thread):
         if self.tmpdir != None:
             self.dgettext['tmpdir'] = self.tmpdir.encode(PLATFORMENCODING)
         self.quality = state.quality['zip']
+        self.level = state.quality['deflate']
         ####
         self.jpgsize = state['jpgsize']
         self.jpgquality = state.quality['img']
         self.jpgzoom = state['jpgzoom']
         self.copymode = state['copymode']
+        self.workers = state['copyworkers']
+        # Only a directory export can be incremental, KMZ files are
+        # generated from a new temporary directory.
+        self.manifest = None
+        if state['incremental'] > 0 and self.tmpdir == None and self.outputdir != None:
+            self.manifest = os.path.join(self.outputdir, PhotoPlace_Cfg_ExportManifestFile)
+            self.dgettext['manifest'] = self.manifest.encode(PLATFORMENCODING)
         ####
         self.outputkmldir = os.path.dirname(self.outputkml)
         self.fd = None
+        self.kmz = None
+        if self.outputkmz != None:
+            # Photos go directly to the KMZ, the temporary directory only
+            # gets the KML and the files of the add-ons.
+            try:
+                self.kmz = _KmzFile(self.outputkmz, "w", self.level)
+            except IOError as (errno, strerror):
+                self.dgettext['errno'] = errno
+                self.dgettext['strerror'] = strerror
+                msg = _("Cannot create KMZ file '%(outputkmz)s': (%(errno)s) %(strerror)s.")
+                msg = msg % self.dgettext
+                self.logger.error(msg)
+                tip = _("Check if output dir '%s' exists and is writable.") % \
+                    os.path.dirname(self.outputkmz)
+                raise Error(msg, tip, "IOError")
         try:
             self.fd = open(self.outputkml, 'wb')
         except IOError as (errno, strerror):
@@ -80,6 +175,7 @@ class SaveFiles(Interface.Action, threading.Thread):
         ####
         self.num_photos = 0
         self.num_copies = 0
+        self.num_unchanged = 0
         if (self.copymode > 0) and (self.outputdir != None):
             msg = _("Generating copy of JPEG files in '%(outputdir)s' ...")
             self.logger.info(msg % self.dgettext)
@@ -88,8 +184,13 @@ class SaveFiles(Interface.Action, threading.Thread):
         self._notify_ini(self.fd, self.outputkml, self.outputkmz,
             self.photouri, self.outputdir, self.quality)
         try:
-            kmldom = self.state.kmldata.getKml()
-            kmldom.writexml(self.fd, u"", u"   ", u"\n", "utf-8")
+            kmldom = self.state.kmldata.writeKml(self.fd, "utf-8")
+            self.fd.close()
+            if self.kmz != None:
+                # From the file, so the streamed placemarks (StreamKML)
+                # are never loaded in memory.
+                self.kmz.write(self.outputkml, os.path.basename(self.outputkml),
+                    self.quality)
             self.num_files += 1
         except Exception as e:
             self.dgettext['error'] = str(e)
@@ -105,60 +206,202 @@ class SaveFiles(Interface.Action, threading.Thread):
     def go(self, rini):
         #####
         if (self.copymode > 0) and (self.outputdir != None):
+            # All photos (new_file is None if it is not copied) in order
+            photos = []
+            jobs = []
             for photo in self.state.geophotos:
-                self._notify_run(photo.path, 0)
-                if photo.status < self.state.status:
-                    continue
-                self.dgettext['photo'] = photo.name.encode(PLATFORMENCODING)
-                self.dgettext['photo_lon'] = photo.lon
-                self.dgettext['photo_lat'] = photo.lat
-                self.dgettext['photo_ele'] = photo.ele
-                self.dgettext['photo_time'] = photo.time
-                if (self.copymode == 2) or ((self.copymode == 1) and photo.isGeoLocated()):
+                new_file = None
+                if photo.status >= self.state.status and ((self.copymode == 2) \
+                    or ((self.copymode == 1) and photo.isGeoLocated())):
                     new_file = os.path.join(self.outputdir, photo.name)
+                    jobs.append((photo, new_file))
+                photos.append((photo, new_file))
+            if self.manifest != None:
+                jobs = self._unchanged(jobs)
+            pending = set(new_file for (photo, new_file) in jobs)
+            pool = None
+            workers = self.workers
+            if workers > 1 and threading.current_thread().name != 'MainThread':
+                # Forking a process with other threads running (GUI) is
+                # not safe, the pool is only used in batch mode.
+                msg = _("CopyWorkers is only used in batch mode, photos are "
+                    "copied in one process.")
+                self.logger.debug(msg)
+                workers = 1
+            if workers > 1 and len(jobs) > 1:
+                # Resizing is CPU bound, it is spread in processes
+                pool = multiprocessing.Pool(workers)
+                kmz = self.kmz != None
+                pjobs = [(photo.path, photo.name, None if kmz else new_file, photo.getExifData(),
+                    photo.isGeoLocated(), self.jpgzoom, self.jpgsize, self.jpgquality)
+                    for (photo, new_file) in jobs]
+                results = pool.imap(_copy, pjobs)
+            else:
+                results = (self._copy(photo, new_file) for (photo, new_file) in jobs)
+            try:
+                for (photo, new_file) in photos:
+                    self._notify_run(photo.path, 0)
+                    if photo.status < self.state.status:
+                        continue
+                    self.dgettext['photo'] = photo.name.encode(PLATFORMENCODING)
+                    self.dgettext['photo_lon'] = photo.lon
+                    self.dgettext['photo_lat'] = photo.lat
+                    self.dgettext['photo_ele'] = photo.ele
+                    self.dgettext['photo_time'] = photo.time
+                    if new_file == None:
+                        msg = _("Ignoring not geolocated photo '%(photo)s' (%(photo_time)s).")
+                        self.logger.warning(msg % self.dgettext)
+                        self._notify_run(photo.path, -1)
+                        continue
                     self.dgettext['new_path'] = new_file.encode(PLATFORMENCODING)
-                    try:
-                        if photo.isGeoLocated():
-                            photo.attrToExif()
-                        photo.copy(new_file, True, self.jpgzoom, self.jpgsize, self.jpgquality)
-                        self.num_copies += 1
-                    except Exception as e:
-                        self.dgettext['error'] = str(e)
+                    if not new_file in pending:
+                        self.num_unchanged += 1
+                        self.num_photos += 1
+                        self._notify_run(new_file, 1)
+                        msg = _("Photo '%(photo)s' is unchanged in '%(new_path)s'.")
+                        self.logger.debug(msg % self.dgettext)
+                        continue
+                    (data, error) = results.next()
+                    if error == None and self.kmz != None:
+                        error = self._zip(new_file, data)
+                    if error != None:
+                        self.dgettext['error'] = error
                         msg = _("Cannot copy '%(photo)s' to '%(new_path)s': %(error)s.")
                         self.logger.error(msg % self.dgettext)
+                        if self.manifest != None:
+                            self.fingerprints.pop(photo.name, None)
                     else:
+                        self.num_copies += 1
                         self._notify_run(new_file, 1)
                         msg = _("Photo '%(photo)s' has been copied to '%(new_path)s'.")
                         self.logger.debug(msg % self.dgettext)
                     self.num_photos += 1
-                else:
-                    msg = _("Ignoring not geolocated photo '%(photo)s' (%(photo_time)s).")
-                    self.logger.warning(msg % self.dgettext)
-                    self._notify_run(photo.path, -1)
+            finally:
+                if pool != None:
+                    pool.terminate()
+                    pool.join()
+                if self.manifest != None:
+                    self._writeManifest()
         #####
         self.num_files += self.num_copies
-        kmz_out = None
-        if self.outputkmz == None:
+        if self.kmz == None:
             self._notify_run(self.outputkml, 1)
             msg = _("KML output file '%(outputkml)s' has been generated.")
             self.logger.info(msg % self.dgettext)
         else:
             msg = _("Generating KMZ file '%(outputkmz)s' ...")
             self.logger.info(msg % self.dgettext)
-            kmz_out = zipfile.ZipFile(self.outputkmz, "w")
-            self.rzip(kmz_out, self.outputkmldir)
-        return kmz_out
+            # Files of the add-ons
+            self.rzip(self.kmz, self.outputkmldir)
+        return self.kmz
+
+
+    def _copy(self, photo, new_file):
+        try:
+            if photo.isGeoLocated():
+                photo.attrToExif()
+            if self.kmz != None:
+                data = photo.copyData(True, self.jpgzoom, self.jpgsize, self.jpgquality)
+                return (data, None)
+            photo.copy(new_file, True, self.jpgzoom, self.jpgsize, self.jpgquality)
+        except Exception as e:
+            return (None, str(e))
+        finally:
+            # Exif changes were only for the copy (lazy mode)
+            photo.releaseExif()
+        return (None, None)
+
+
+    def _zip(self, new_file, data):
+        # JPEG data is already compressed, it is stored.
+        try:
+            name = os.path.relpath(new_file, self.outputkmldir)
+            self.kmz.writestr(name, data, zipfile.ZIP_STORED)
+        except Exception as e:
+            return str(e)
+        return None
+
+
+    def _fingerprint(self, photo):
+        # Everything used to generate the copy: source file, resize
+        # parameters, the geodata written to its Exif and a hash of the
+        # Exif data and attributes (edited in the GUI).
+        try:
+            stat = os.stat(photo.path)
+        except OSError:
+            return None
+        exifdata = photo.getExifData()
+        exifdata['tags'] = sorted((exifdata['tags'] or {}).items())
+        data = repr([sorted(exifdata.items()), sorted(photo.attr.items())])
+        return [ photo.path, stat.st_size, stat.st_mtime,
+            self.jpgzoom, list(self.jpgsize), self.jpgquality,
+            photo.isGeoLocated(), photo.lat, photo.lon, photo.ele,
+            str(photo.time), photo.orientation,
+            hashlib.sha1(data).hexdigest() ]
+
+
+    def _unchanged(self, jobs):
+        # Photos with the same fingerprint in the manifest of the last
+        # export are not copied again. It returns the photos to copy.
+        manifest = {}
+        try:
+            fd = open(self.manifest, 'rb')
+            try:
+                manifest = json.load(fd)
+            finally:
+                fd.close()
+        except IOError:
+            pass
+        except ValueError as e:
+            self.dgettext['error'] = str(e)
+            msg = _("Cannot read manifest '%(manifest)s': %(error)s. All photos will be copied.")
+            self.logger.warning(msg % self.dgettext)
+        self.fingerprints = {}
+        pending = []
+        for (photo, new_file) in jobs:
+            fingerprint = self._fingerprint(photo)
+            if fingerprint == None:
+                pending.append((photo, new_file))
+                continue
+            self.fingerprints[photo.name] = fingerprint
+            if manifest.get(photo.name) != fingerprint or not os.path.isfile(new_file):
+                pending.append((photo, new_file))
+        return pending
+
+
+    def _writeManifest(self):
+        tmp = self.manifest + PhotoPlace_Cfg_fileextold
+        try:
+            fd = open(tmp, 'wb')
+            try:
+                json.dump(self.fingerprints, fd)
+            finally:
+                fd.close()
+            if os.path.isfile(self.manifest):
+                # Windows cannot rename over an existing file
+                os.unlink(self.manifest)
+            os.rename(tmp, self.manifest)
+        except (IOError, OSError) as e:
+            self.dgettext['error'] = str(e)
+            msg = _("Cannot write manifest '%(manifest)s': %(error)s.")
+            self.logger.error(msg % self.dgettext)
 
 
     def rzip(self, zipf, folder, base=u''):
         for f in os.listdir(folder):
             full_path = os.path.join(folder, f)
+            if full_path == self.outputkml:
+                # already the first entry
+                continue
             if os.path.isfile(full_path):
                 base_path = os.path.join(base, f)
                 self.logger.debug(_("Adding file '%s' to KMZ ...") % \
                     base_path.encode(PLATFORMENCODING))
                 self._notify_run(base_path, 1)
-                zipf.write(full_path, base_path, self.quality)
+                compress = self.quality
+                if PhotoPlace_Cfg_ZipStoredRegExp.search(f):
+                    compress = zipfile.ZIP_STORED
+                zipf.write(full_path, base_path, compress)
                 self.num_files += 1
             elif os.path.isdir(full_path):
                 self.rzip(zipf, full_path, f)
@@ -171,6 +414,10 @@ class SaveFiles(Interface.Action, threading.Thread):
             self.dgettext['num_copies'] = self.num_copies
             msg = _("%(num_photos)d photos have been processed, %(num_copies)d were copied.")
             self.logger.info(msg % self.dgettext)
+            if self.manifest != None:
+                self.dgettext['num_unchanged'] = self.num_unchanged
+                msg = _("%(num_unchanged)d photos were unchanged since the last export.")
+                self.logger.info(msg % self.dgettext)
         ####
         self._notify_end(self.num_files)
         if rgo:
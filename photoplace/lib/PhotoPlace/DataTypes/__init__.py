@@ -25,10 +25,12 @@ __license__ = "Apache 2.0"
 __copyright__ ="(c) Jose Riguera"
 
 
-__all__ = ['geoPhotoData', 'kmlData']
+__all__ = ['geoPhotoData', 'kmlData', 'exifCache', 'exifReader']
 
 import kmlData
 import geoPhotoData
+import exifCache
+import exifReader
 
 
 # EOF
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#       exifCache.py
+#
+#   Copyright 2010-2015 Jose Riguera Lopez <jriguera@gmail.com>
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+"""
+A persistent cache (SQLite) of the Exif data of photos, to avoid reading
+the files again when they did not change (same path, size and mtime).
+"""
+__program__ = "photoplace"
+__author__ = "Jose Riguera Lopez <jriguera@gmail.com>"
+__version__ = "0.6.1"
+__date__ = "Dec 2014"
+__license__ = "Apache 2.0"
+__copyright__ ="(c) Jose Riguera"
+
+
+import os
+import sys
+import threading
+import cPickle
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None
+
+
+
+# ###############################
+# Exceptions for ExifCache module
+# ###############################
+
+class ExifCacheError(Exception):
+    """
+    Base class for exceptions in ExifCache module.
+    """
+    def __init__(self, msg='ExifCacheError!'):
+        self.value = msg
+
+    def __str__(self):
+        return self.value
+
+
+# ########################
+# ExifCache implementation
+# ########################
+
+# Change it if the format of the data changes, the cache will be emptied.
+_ExifCache_VERSION = 1
+
+
+class ExifCache(object):
+    """
+    Exif data of photos (the dictionary from GeoPhoto.getExifData) stored in
+    a SQLite database, indexed by path and valid only with the same size and
+    modification time of the file. It can be used from several threads.
+    """
+    def __init__(self, filename):
+        """
+        ExifCache class constructor.
+
+        :Parameters:
+            -`filename`: SQLite database file, it is created if it does not exist.
+        """
+        object.__init__(self)
+        if sqlite3 == None:
+            raise ExifCacheError(_("SQLite (sqlite3 module) is not available."))
+        self.filename = filename
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        try:
+            self.db = sqlite3.connect(filename, check_same_thread=False)
+            version = self.db.execute("PRAGMA user_version").fetchone()[0]
+            if version != _ExifCache_VERSION:
+                self.db.execute("DROP TABLE IF EXISTS exif")
+                self.db.execute("PRAGMA user_version = %d" % _ExifCache_VERSION)
+            self.db.execute("CREATE TABLE IF NOT EXISTS exif ("
+                "path TEXT PRIMARY KEY, size INTEGER, mtime REAL, data BLOB)")
+            self.db.commit()
+        except sqlite3.Error as e:
+            dgettext = {'cache': filename, 'error': str(e)}
+            msg = _("Cannot open Exif cache '%(cache)s': %(error)s.")
+            raise ExifCacheError(msg % dgettext)
+
+
+    def _key(self, path):
+        if not isinstance(path, unicode):
+            path = unicode(path, sys.getfilesystemencoding() or 'utf-8', 'replace')
+        stat = os.stat(path)
+        return (path, stat.st_size, stat.st_mtime)
+
+
+    def get(self, path):
+        """
+        Exif data of the file or None if it is not in the cache or the file
+        changed.
+        """
+        (path, size, mtime) = self._key(path)
+        with self.lock:
+            row = self.db.execute("SELECT data FROM exif WHERE "
+                "path = ? AND size = ? AND mtime = ?", (path, size, mtime)).fetchone()
+            if row == None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return cPickle.loads(str(row[0]))
+
+
+    def put(self, path, data):
+        """
+        Stores the Exif data of the file. Changes are saved with 'commit'.
+        """
+        (path, size, mtime) = self._key(path)
+        blob = sqlite3.Binary(cPickle.dumps(data, cPickle.HIGHEST_PROTOCOL))
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO exif (path, size, mtime, data) "
+                "VALUES (?, ?, ?, ?)", (path, size, mtime, blob))
+
+
+    def putTags(self, path, tags):
+        """
+        Replaces the Exif tags of the data stored for the file, only if it
+        is in the cache and the file did not change. Returns True if the
+        data was updated.
+        """
+        (path, size, mtime) = self._key(path)
+        with self.lock:
+            row = self.db.execute("SELECT data FROM exif WHERE "
+                "path = ? AND size = ? AND mtime = ?", (path, size, mtime)).fetchone()
+            if row == None:
+                return False
+            data = cPickle.loads(str(row[0]))
+            data['tags'] = tags
+            blob = sqlite3.Binary(cPickle.dumps(data, cPickle.HIGHEST_PROTOCOL))
+            self.db.execute("UPDATE exif SET data = ? WHERE path = ?", (blob, path))
+        return True
+
+
+    def commit(self):
+        with self.lock:
+            self.db.commit()
+
+
+    def close(self):
+        with self.lock:
+            self.db.commit()
+            self.db.close()
+
+
+# EOF
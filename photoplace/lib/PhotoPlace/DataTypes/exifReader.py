@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#       exifReader.py
+#
+#   Copyright 2010-2015 Jose Riguera Lopez <jriguera@gmail.com>
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+"""
+A fast reader of the few Exif tags needed to geolocate photos (DateTime,
+Orientation and GPSInfo). Only the APP1 (Exif) segment of the JPEG header
+is read, the image data is never touched.
+"""
+__program__ = "photoplace"
+__author__ = "Jose Riguera Lopez <jriguera@gmail.com>"
+__version__ = "0.6.1"
+__date__ = "Dec 2014"
+__license__ = "Apache 2.0"
+__copyright__ ="(c) Jose Riguera"
+
+
+import struct
+import datetime
+
+
+
+# ################################
+# Exceptions for ExifReader module
+# ################################
+
+class ExifReaderError(Exception):
+    """
+    Base class for exceptions in ExifReader module.
+    """
+    def __init__(self, msg='ExifReaderError!'):
+        self.value = msg
+
+    def __str__(self):
+        return self.value
+
+
+# #########################
+# ExifReader implementation
+# #########################
+
+# Tags: (name, TIFF type, count), entries of other types (or counts) are
+# ignored. Count None means any count.
+_ExifReader_IFD0_TAGS = {
+    0x0112: ('Orientation', 3, 1),
+    0x0132: ('DateTime', 2, None),
+    0x8825: ('GPSInfo', 4, 1),
+}
+_ExifReader_GPS_TAGS = {
+    0x0001: ('GPSLatitudeRef', 2, None),
+    0x0002: ('GPSLatitude', 5, 3),
+    0x0003: ('GPSLongitudeRef', 2, None),
+    0x0004: ('GPSLongitude', 5, 3),
+    0x0005: ('GPSAltitudeRef', 1, 1),
+    0x0006: ('GPSAltitude', 5, 1),
+}
+# TIFF types: (size, struct format)
+_ExifReader_TYPES = {
+    1: (1, 'B'),    # BYTE
+    2: (1, 's'),    # ASCII
+    3: (2, 'H'),    # SHORT
+    4: (4, 'L'),    # LONG
+    5: (8, 'LL'),   # RATIONAL
+    7: (1, 'B'),    # UNDEFINED
+    9: (4, 'l'),    # SLONG
+    10: (8, 'll'),  # SRATIONAL
+}
+_ExifReader_TIMEFORMAT = "%Y:%m:%d %H:%M:%S"
+# Markers without length
+_ExifReader_STANDALONE = frozenset([0x01] + range(0xD0, 0xD8))
+
+
+def _app1(fd):
+    # Exif (TIFF) data of the APP1 segment, None if there is no Exif
+    if fd.read(2) != '\xff\xd8':
+        raise ExifReaderError(_("It is not a JPEG file"))
+    while True:
+        byte = fd.read(1)
+        if byte != '\xff':
+            raise ExifReaderError(_("Wrong JPEG marker"))
+        while byte == '\xff':
+            # fill bytes
+            byte = fd.read(1)
+        if not byte:
+            raise ExifReaderError(_("Unexpected end of JPEG file"))
+        marker = ord(byte)
+        if marker == 0xDA or marker == 0xD9:
+            # start of image data or end, no Exif in the header
+            return None
+        if marker in _ExifReader_STANDALONE:
+            continue
+        data = fd.read(2)
+        if len(data) < 2:
+            raise ExifReaderError(_("Unexpected end of JPEG file"))
+        length = struct.unpack('>H', data)[0] - 2
+        if marker == 0xE1:
+            data = fd.read(length)
+            if data[:6] == 'Exif\x00\x00':
+                return data[6:]
+        else:
+            fd.seek(length, 1)
+
+
+def _value(tiff, order, tag_type, count, offset_data):
+    (size, fmt) = _ExifReader_TYPES[tag_type]
+    total = size * count
+    if total <= 4:
+        data = offset_data[:total]
+    else:
+        offset = struct.unpack(order + 'L', offset_data)[0]
+        data = tiff[offset:offset + total]
+        if len(data) < total:
+            raise ExifReaderError(_("Exif value out of range"))
+    if tag_type == 2:
+        return data.split('\x00', 1)[0]
+    values = struct.unpack(order + fmt * count, data)
+    if tag_type in (5, 10):
+        values = [float(values[pos]) / float(values[pos + 1]) \
+            for pos in xrange(0, len(values), 2)]
+    if count == 1:
+        return values[0]
+    return tuple(values)
+
+
+def _ifd(tiff, order, offset, names):
+    tags = {}
+    if offset + 2 > len(tiff):
+        raise ExifReaderError(_("Exif IFD out of range"))
+    num_entries = struct.unpack(order + 'H', tiff[offset:offset + 2])[0]
+    offset += 2
+    for pos in xrange(num_entries):
+        entry = tiff[offset + pos * 12:offset + pos * 12 + 12]
+        if len(entry) < 12:
+            raise ExifReaderError(_("Exif IFD out of range"))
+        (tag, tag_type, count) = struct.unpack(order + 'HHL', entry[:8])
+        if tag in names:
+            (name, expected_type, expected_count) = names[tag]
+            if tag_type != expected_type:
+                continue
+            if expected_count != None and count != expected_count:
+                continue
+            tags[name] = _value(tiff, order, tag_type, count, entry[8:])
+    return tags
+
+
+def readExifHeader(path):
+    """
+    Reads DateTime (datetime), Orientation and the GPS tags (GPSLatitude,
+    GPSLatitudeRef, GPSLongitude, GPSLongitudeRef, GPSAltitude and
+    GPSAltitudeRef) from the Exif header of a JPEG file. Rationals are
+    floats. Only the tags found are in the returned dictionary.
+
+    :Parameters:
+        -`path`: path of the jpeg file.
+    """
+    try:
+        fd = open(path, 'rb')
+        try:
+            tiff = _app1(fd)
+        finally:
+            fd.close()
+        if tiff == None:
+            return {}
+        if tiff[:2] == 'II':
+            order = '<'
+        elif tiff[:2] == 'MM':
+            order = '>'
+        else:
+            raise ExifReaderError(_("Wrong TIFF header"))
+        (magic, offset) = struct.unpack(order + 'HL', tiff[2:8])
+        if magic != 42:
+            raise ExifReaderError(_("Wrong TIFF header"))
+        tags = _ifd(tiff, order, offset, _ExifReader_IFD0_TAGS)
+        if 'GPSInfo' in tags:
+            tags.update(_ifd(tiff, order, tags['GPSInfo'], _ExifReader_GPS_TAGS))
+            del tags['GPSInfo']
+    except (ExifReaderError, IOError, struct.error, ZeroDivisionError, TypeError) as e:
+        dgettext = {'path': path, 'error': str(e)}
+        msg = _("Cannot read Exif header of '%(path)s': %(error)s.")
+        raise ExifReaderError(msg % dgettext)
+    if 'DateTime' in tags:
+        try:
+            tags['DateTime'] = datetime.datetime.strptime(tags['DateTime'],
+                _ExifReader_TIMEFORMAT)
+        except (ValueError, TypeError):
+            del tags['DateTime']
+    return tags
+
+
+# EOF
@@ -34,6 +34,7 @@ import time
 import re
 import datetime
 import fractions
+import cStringIO
 try:
     from PIL import Image
 except ImportError:
@@ -49,6 +50,8 @@ except ImportError:
 
 from pyGPX import geomath
 
+import exifReader
+
 
 
 # ##############################
@@ -93,7 +96,8 @@ class GeoPhoto(object):
         dtime = _GeoPhoto_DEFAULT_TIME,
         azi = _GeoPhoto_DEFAULT_AZI,
         tilt = _GeoPhoto_DEFAULT_TILT,
-        loadexif = True):
+        loadexif = True,
+        lazyexif = False):
         """
         GeoPhoto class constructor. It represents a geolocalized image with
         coordinates and time. Other attributes are allowed in attr internal
@@ -107,6 +111,8 @@ class GeoPhoto(object):
             -`ele`: Elevation of the photo. Meters.
             -`dtime`: Time. 'datetime.datetime' class
             -`loadexif`: if true, exif data will be read/written
+            -`lazyexif`: if true, only time, GPS and orientation are kept
+            from exif. The metadata is read again when it is needed.
         """
         object.__init__(self)
         self.path = path
@@ -115,9 +121,12 @@ class GeoPhoto(object):
         self.toffset = 0
         if name == None:
             self.name = os.path.basename(self.path)
-        self.exif = None
+        self._exif = None
+        self.exiftags = {}
+        self.orientation = 1
         self.attr = {}
         self.loadexif = False
+        self.lazyexif = lazyexif
         self.ptime = None
         self.time = datetime.datetime.fromtimestamp(os.path.getmtime(path))
         self.lat = _GeoPhoto_DEFAULT_LAT
@@ -161,12 +170,18 @@ class GeoPhoto(object):
         ]
         if k in keys:
             return getattr(self, key)
-        else:
-            if self.loadexif and k in self.exif.exif_keys:
-                data = self.exif[k]
-                return data.value
-            else:
-                return self.attr[k]
+        elif self.loadexif and k.startswith('Exif.'):
+            # In lazy mode the metadata is released after that (if it
+            # was not loaded before), like "getExifTags"
+            loaded = self._exif is None
+            try:
+                if k in self.exif.exif_keys:
+                    data = self.exif[k]
+                    return data.value
+            finally:
+                if loaded:
+                    self.releaseExif()
+        return self.attr[k]
 
 
     def __setitem__(self, key, value):
@@ -203,11 +218,74 @@ class GeoPhoto(object):
             self.toffset = value
         elif k == "ptime":
             self.ptime = value
+        elif self.loadexif and k.startswith('Exif.') and k in self.exif.exif_keys:
+            # The metadata is changed and kept until it is written
+            # ("writeExif" releases it in lazy mode)
+            self.exif[k] = value
+            if self.exiftags is not None:
+                self.exiftags.update(self._exifTags(self.exif, [k]))
         else:
-            if self.loadexif and k in self.exif.exif_keys:
-                self.exif[k] = value
-            else:
-                self.attr[k] = value
+            self.attr[k] = value
+
+
+    @property
+    def exif(self):
+        """
+        pyexiv2 metadata of the image. If the Exif data was set from a cache
+        (setExifData), the file is read the first time it is used.
+        """
+        if self._exif is None and self.loadexif:
+            self._exif = self._readMetadata()
+        return self._exif
+
+
+    @exif.setter
+    def exif(self, value):
+        self._exif = value
+
+
+    def _readMetadata(self):
+        try:
+            image = pyexiv2.metadata.ImageMetadata(self.path)
+            image.read()
+        except Exception as e:
+            self.dgettext['error'] = str(e)
+            msg = _("Cannot read image file '%(image_path)s': %(error)s.")
+            raise GeoPhotoError(msg % self.dgettext)
+        return image
+
+
+    def getExifData(self):
+        """
+        Dictionary with the data read from Exif: 'lat', 'lon', 'ele', 'time',
+        'orientation' and 'tags' (string values of all Exif tags, or in lazy
+        mode only the ones already asked, None if the photo does not have
+        them). It can be stored in a cache and set again with 'setExifData'.
+        """
+        data = {
+            'lat': self.lat,
+            'lon': self.lon,
+            'ele': self.ele,
+            'time': self.time,
+            'orientation': self.orientation,
+            'tags': self.exiftags,
+        }
+        return data
+
+
+    def setExifData(self, data):
+        """
+        Sets the data returned by 'getExifData' without reading the file.
+        The pyexiv2 metadata ('exif') will be read only if it is used.
+        """
+        self.lat = data['lat']
+        self.lon = data['lon']
+        self.ele = data['ele']
+        self.time = data['time']
+        self.orientation = data['orientation']
+        self.exiftags = data['tags']
+        self._exif = None
+        self.loadexif = True
 
 
     def readExif(self, gpsinfo=True, force=False):
@@ -218,17 +296,13 @@ class GeoPhoto(object):
         :Parameters:
             -`gpsinfo`: if true, GPSInfo Exif data will be read.
         """
+        if self.lazyexif and self._readExifHeader(gpsinfo, force):
+            return True
         lat = _GeoPhoto_DEFAULT_LAT
         lon = _GeoPhoto_DEFAULT_LON
         ele = _GeoPhoto_DEFAULT_ELE
         self.loadexif = False
-        try:
-            image = pyexiv2.metadata.ImageMetadata(self.path)
-            image.read()
-        except Exception as e:
-            self.dgettext['error'] = str(e)
-            msg = _("Cannot read image file '%(image_path)s': %(error)s.")
-            raise GeoPhotoError(msg % self.dgettext)
+        image = self._readMetadata()
         if gpsinfo:
             try:
                 if 'Exif.GPSInfo.GPSLatitude' in image.exif_keys:
@@ -273,11 +347,150 @@ class GeoPhoto(object):
             self.time = image['Exif.Image.DateTime'].value
         except:
             pass
-        self.exif = image
+        self.orientation = 1
+        try:
+            self.orientation = int(image['Exif.Image.Orientation'].value)
+        except:
+            pass
+        self.loadexif = True
+        if self.lazyexif:
+            self.exiftags = {}
+            self.exif = None
+        else:
+            self.exiftags = self._exifTags(image)
+            self.exif = image
+        return True
+
+
+    def _readExifHeader(self, gpsinfo=True, force=False):
+        # Lazy mode, reads only the needed tags with exifReader (no pyexiv2).
+        # Returns False if the header cannot be parsed.
+        lat = _GeoPhoto_DEFAULT_LAT
+        lon = _GeoPhoto_DEFAULT_LON
+        ele = _GeoPhoto_DEFAULT_ELE
+        try:
+            tags = exifReader.readExifHeader(self.path)
+        except exifReader.ExifReaderError:
+            return False
+        if gpsinfo:
+            try:
+                if 'GPSLatitude' in tags:
+                    (gg, mm, ss) = tags['GPSLatitude']
+                    lat = geomath.DMStoN(gg, mm, ss)
+                    if tags['GPSLatitudeRef'].upper() == 'S':
+                        lat = -lat
+                    (gg, mm, ss) = tags['GPSLongitude']
+                    lon = geomath.DMStoN(gg, mm, ss)
+                    if tags['GPSLongitudeRef'].upper() == 'W':
+                        lon = -lon
+                if 'GPSAltitude' in tags:
+                    ele = float(tags['GPSAltitude'])
+                    try:
+                        if int(tags['GPSAltitudeRef']) == 1:
+                            ele = -ele
+                    except:
+                        pass
+            except Exception as e:
+                self.dgettext['error'] = str(e)
+                msg = _("Cannot read GPS metadata of '%(image_path)s': %(error)s")
+                if not force:
+                    raise GeoPhotoError(msg % self.dgettext)
+        self.lat = lat
+        self.lon = lon
+        self.ele = ele
+        if 'DateTime' in tags:
+            self.time = tags['DateTime']
+        self.orientation = tags.get('Orientation', 1)
         self.loadexif = True
+        self.exiftags = {}
+        self.exif = None
         return True
 
 
+    def _exifTags(self, image, keys=None):
+        tags = {}
+        if keys is None:
+            keys = image.exif_keys
+        else:
+            available = set(image.exif_keys)
+            keys = [k for k in keys if k in available]
+        for k in keys:
+            try:
+                tags[k] = str(image[k].value)
+            except:
+                pass
+        return tags
+
+
+    def getExifTags(self, keys=None):
+        """
+        Dictionary with the string values of all Exif tags, or only the ones
+        in the list `keys` (if they exist). In lazy mode, only the tags in
+        `keys` are kept (also the missing ones) and the file is read only
+        for the tags not asked before. The metadata is released after that
+        (if it was not loaded before).
+        """
+        if not self.lazyexif:
+            if keys is None or not self.exiftags:
+                return self.exiftags or {}
+            return dict((k, self.exiftags[k]) for k in keys if k in self.exiftags)
+        if self.exiftags is None:
+            self.exiftags = {}
+        if keys is None:
+            pending = None
+        else:
+            pending = [k for k in keys if not k in self.exiftags]
+        if self.loadexif and (pending is None or pending):
+            loaded = self._exif is None
+            try:
+                tags = self._exifTags(self.exif, pending)
+            finally:
+                if loaded:
+                    self.releaseExif()
+            if pending is None:
+                return tags
+            for k in pending:
+                self.exiftags[k] = tags.get(k)
+        elif keys is None:
+            keys = self.exiftags.keys()
+        return dict((k, self.exiftags[k]) for k in keys
+            if self.exiftags.get(k) is not None)
+
+
+    def getExifTag(self, key):
+        """
+        String value of the Exif tag `key`, KeyError if it does not exist.
+        """
+        return self.getExifTags([key])[key]
+
+
+    def getExifPreview(self):
+        """
+        Data (JPEG) of the largest preview image in Exif, None if there is
+        not. In lazy mode the metadata is released after that (if it was not
+        loaded before).
+        """
+        if not self.loadexif:
+            return None
+        loaded = self._exif is None
+        try:
+            previews = self.exif.previews
+            if previews:
+                return previews[-1].data
+            return None
+        finally:
+            if loaded:
+                self.releaseExif()
+
+
+    def releaseExif(self):
+        """
+        In lazy mode, frees the metadata. It will be read again if it is used.
+        """
+        if self.lazyexif:
+            self._exif = None
+
+
     def writeExif(self, gpsinfo=True):
         """
         Write the Exif tags to file only if exif data were read previously.
@@ -296,6 +509,8 @@ class GeoPhoto(object):
                 self.dgettext['error'] = str(e)
                 msg = _("Cannot write metadata of '%(image_path)s': %(error)s.")
                 raise GeoPhotoError(msg % self.dgettext)
+            finally:
+                self.releaseExif()
             return True
         else:
             return False
@@ -362,6 +577,62 @@ class GeoPhoto(object):
         return True
 
 
+    def _mirror(self, zoom, size, quality, maxsize):
+        # Resized and rotated (Exif orientation) image
+        im = Image.open(self.path)
+        (im_width, im_height) = im.size
+        # Size transformations
+        (width, height) = size
+        new_size = None
+        if zoom < 1:
+            new_size = (int(im_width * zoom), int(im_height * zoom))
+        elif width != 0 and height != 0:
+            new_size = (width, height)
+        elif maxsize != 0:
+            msize = im_height
+            if im_width > im_height:
+                msize = im_width
+            zoom = float(maxsize) / float(msize)
+            new_size = (int(im_width * zoom), int(im_height * zoom))
+        if new_size == None:
+            mirror = im.copy()
+        else:
+            if im.format == 'JPEG' and \
+                new_size[0] < im_width and new_size[1] < im_height:
+                # The JPEG decoder can scale down (1/2, 1/4, 1/8) while
+                # reading, never below new_size. Much faster and less
+                # memory, the final resize keeps the quality.
+                im.draft(im.mode, new_size)
+            mirror = im.resize(new_size, quality)
+        # Orientation
+        orientation = self.orientation
+        if orientation == 1:
+            # Nothing
+            pass
+        elif orientation == 2:
+            # Vertical Mirror
+            mirror = mirror.transpose(Image.FLIP_LEFT_RIGHT)
+        elif orientation == 3:
+            # Rotation 180°
+            mirror = mirror.transpose(Image.ROTATE_180)
+        elif orientation == 4:
+            # Horizontal Mirror
+            mirror = mirror.transpose(Image.FLIP_TOP_BOTTOM)
+        elif orientation == 5:
+            # Horizontal Mirror + Rotation 270°
+            mirror = mirror.transpose(Image.FLIP_TOP_BOTTOM).transpose(Image.ROTATE_270)
+        elif orientation == 6:
+            # Rotation 270°
+            mirror = mirror.transpose(Image.ROTATE_270)
+        elif orientation == 7:
+            # Vertical Mirror + Rotation 270°
+            mirror = mirror.transpose(Image.FLIP_LEFT_RIGHT).transpose(Image.ROTATE_270)
+        elif orientation == 8:
+            # Rotation 90°
+            mirror = mirror.transpose(Image.ROTATE_90)
+        return mirror
+
+
     def copy(self, dst, copyexif=True, zoom=1.0, size=(0,0), quality=Image.ANTIALIAS, maxsize=0):
         """
         It copies (or overwrites) the image file to `dst` and resizes it if it is necessary.
@@ -377,49 +648,7 @@ class GeoPhoto(object):
             -`height` : new image height.
         """
         try:
-            im = Image.open(self.path)
-            (im_width, im_height) = im.size
-            # Size transformations
-            (width, height) = size
-            if zoom < 1:
-                mirror = im.resize((int(im_width * zoom), int(im_height * zoom)), quality)
-            elif width != 0 and height != 0:
-                mirror = im.resize((width, height), quality)
-            elif maxsize != 0:
-                msize = im_height
-                if im_width > im_height:
-                    msize = im_width
-                zoom = float(maxsize) / float(msize)
-                mirror = im.resize((int(im_width * zoom), int(im_height * zoom)), quality)
-            else:
-                mirror = im.copy()
-            # Orientation
-            if 'Exif.Image.Orientation' in self.exif.exif_keys:
-                orientation = self.exif['Exif.Image.Orientation'].value
-                if orientation == 1:
-                    # Nothing
-                    pass
-                elif orientation == 2:
-                    # Vertical Mirror
-                    mirror = mirror.transpose(Image.FLIP_LEFT_RIGHT)
-                elif orientation == 3:
-                    # Rotation 180°
-                    mirror = mirror.transpose(Image.ROTATE_180)
-                elif orientation == 4:
-                    # Horizontal Mirror
-                    mirror = mirror.transpose(Image.FLIP_TOP_BOTTOM)
-                elif orientation == 5:
-                    # Horizontal Mirror + Rotation 270°
-                    mirror = mirror.transpose(Image.FLIP_TOP_BOTTOM).transpose(Image.ROTATE_270)
-                elif orientation == 6:
-                    # Rotation 270°
-                    mirror = mirror.transpose(Image.ROTATE_270)
-                elif orientation == 7:
-                    # Vertical Mirror + Rotation 270°
-                    mirror = mirror.transpose(Image.FLIP_LEFT_RIGHT).transpose(Image.ROTATE_270)
-                elif orientation == 8:
-                    # Rotation 90°
-                    mirror = mirror.transpose(Image.ROTATE_90)
+            mirror = self._mirror(zoom, size, quality, maxsize)
             if os.path.isfile(dst):
                 os.unlink(dst)
             mirror.save(dst)
@@ -429,6 +658,7 @@ class GeoPhoto(object):
             msg = _("Cannot copy '%(image_path)s' to '%(image_dst)s': %(error)s.")
             raise GeoPhotoError(msg % self.dgettext)
         if copyexif :
+            loaded = self._exif is None
             try:
                 imexiv2 = pyexiv2.metadata.ImageMetadata(dst)
                 imexiv2.read()
@@ -441,6 +671,48 @@ class GeoPhoto(object):
                 msg = _("Cannot copy image metadata from '%(image_path)s' "
                     "to '%(image_dst)s': %(error)s.")
                 raise GeoPhotoError(msg % self.dgettext)
+            finally:
+                if loaded:
+                    self.releaseExif()
+
+
+    def copyData(self, copyexif=True, zoom=1.0, size=(0,0), quality=Image.ANTIALIAS, maxsize=0):
+        """
+        The same as `copy` but the new JPEG image is returned as a string,
+        nothing is written to disk.
+
+        :Parameters:
+            -`copyexif`: if true, Exif data will be copied.
+            -`maxsize`: max size of any side of new image.
+            -`width` : new image width.
+            -`height` : new image height.
+        """
+        try:
+            mirror = self._mirror(zoom, size, quality, maxsize)
+            buff = cStringIO.StringIO()
+            mirror.save(buff, 'JPEG')
+            data = buff.getvalue()
+            buff.close()
+        except Exception as e:
+            self.dgettext['error'] = str(e)
+            msg = _("Cannot resize '%(image_path)s': %(error)s.")
+            raise GeoPhotoError(msg % self.dgettext)
+        if copyexif :
+            loaded = self._exif is None
+            try:
+                imexiv2 = pyexiv2.metadata.ImageMetadata.from_buffer(data)
+                imexiv2.read()
+                self.exif.copy(imexiv2, True, False, False)
+                imexiv2.write()
+                data = imexiv2.buffer
+            except Exception as e:
+                self.dgettext['error'] = str(e)
+                msg = _("Cannot copy image metadata from '%(image_path)s': %(error)s.")
+                raise GeoPhotoError(msg % self.dgettext)
+            finally:
+                if loaded:
+                    self.releaseExif()
+        return data
 
 
     def isGeoLocated(self):
@@ -32,6 +32,8 @@ import xml.dom.minidom
 import urllib
 import codecs
 import re
+import shutil
+import tempfile
 
 import sXMLTemplate
 
@@ -68,6 +70,52 @@ _KmlData_SUBTEMPLATE_MODE_CDATA = "cdata"
 _KmlData_SUBTEMPLATE_MODE_XML = "xml"
 _KmlData_SUBTEMPLATE_MODE_TEXT = "text"
 
+_KmlData_INDENT = u"   "
+_KmlData_NEWLINE = u"\n"
+_KmlData_STREAM_MARK = u" photoplace-kmldata-stream-%d "
+
+
+
+class _KmlDataSpool(object):
+    """
+    Temporary file for the rendered nodes of the streaming mode. Unicode is
+    written as UTF-8, like the encoding of the KML.
+    """
+    def __init__(self):
+        self.fd = tempfile.TemporaryFile()
+
+    def write(self, data):
+        if isinstance(data, unicode):
+            data = data.encode('utf-8')
+        self.fd.write(data)
+
+    def copy(self, fd):
+        self.fd.seek(0)
+        shutil.copyfileobj(self.fd, fd)
+
+    def close(self):
+        self.fd.close()
+
+
+
+class _KmlDataWriter(object):
+    """
+    Writer for "writexml" which puts the content of the spools in place of
+    their mark comments. The marks found are in 'copied'.
+    """
+    def __init__(self, fd, spools):
+        self.fd = fd
+        self.spools = spools
+        self.copied = set()
+
+    def write(self, data):
+        spool = self.spools.get(data)
+        if spool != None:
+            spool.copy(self.fd)
+            self.copied.add(data)
+        else:
+            self.fd.write(data)
+
 
 
 class KmlData(object):
@@ -84,10 +132,15 @@ class KmlData(object):
         sep_xmlnodes=_KmlData_SEPARATOR_XMLNODES,
         default_value=_KmlData_TEMPLATE_DEFAULT_VALUE,
         separator_key=_KmlData_TEMPLATE_SEP_KEY,
-        delete_tag=_KmlData_TEMPLATE_DEL_TAG):
+        delete_tag=_KmlData_TEMPLATE_DEL_TAG, stream=False):
         """
         KmlData class constructor. It is based on sXMLTemplate.SXMLTemplate package.
 
+        In streaming mode the nodes of the photos are written to a temporary
+        file when they are filled, they are not in the DOM (getKml), and they
+        are put in their place by writeKml, so memory does not depend on the
+        number of photos.
+
         :Parameters:
             -`layout_file`: kml global layout file.
             -`photo_path`: list of paths of the nodes that will be completed with
@@ -96,11 +149,13 @@ class KmlData(object):
             -`default_value`: default value in data (see "sXMLTemplate.SXMLTemplate".
             -`separator_key`: separator for default values in templates.
             -`delete_tag`: tag to delete an empty node.
+            -`stream`: streaming mode.
         """
         object.__init__(self)
         self.templates = {}
         self.photo_variables = []
         self.phototemplates = {}
+        self.photocompiled = {}
         self.othertemplates = {}
         self.xmlinfo = xmlinfo
         self.kml = None
@@ -110,6 +165,9 @@ class KmlData(object):
         self.default_value = default_value
         self.sep_xmlnodes = sep_xmlnodes
         self.layout_file = layout_file
+        self.stream = stream
+        self.spools = {}
+        self.spoolmarks = {}
         self.layout = None
         self.layout = self._opentemplate(self.layout_file)
         self.__setkml()
@@ -222,6 +280,7 @@ class KmlData(object):
                 else:
                     self.phototemplates[lpos] = self.templates[lpos]
                     self.photo_variables += self.getVariables(template_variables[lpos])
+                    self.photocompiled[lpos] = self._compile(self.templates[lpos])
         # Merge the rest of templates
         for lpos in self.templates.iterkeys():
             lpos_items = lpos.split(self.sep_xmlnodes)
@@ -269,13 +328,32 @@ class KmlData(object):
         self.kml.setTemplates(self.photo_path)
 
 
-    def setData(self, data, tmptemplates={}):
+    def _compile(self, phototem):
+        # Parsed once, each photo only fills the gaps (see setData)
+        mode, xmldom, content = phototem
+        if xmldom == None:
+            return None
+        try:
+            return sXMLTemplate.SXMLTemplate(xmldom.toxml())
+        except sXMLTemplate.SXMLTemplateError:
+            # It will fail (again) with each photo
+            return None
+
+
+    def setData(self, data, tmptemplates={}, missing=None):
+        """
+        Fills the photo templates with `data`. The values of keys not in
+        `data` are got with the function `missing` (it raises KeyError if the
+        key does not exist), only for the keys used by the templates.
+        """
         sXMLTemplate.SXMLTemplate.deletetag = self.delete_tag
         sXMLTemplate.SXMLTemplate.separatorKey = self.separator_key
         sXMLTemplate.SXMLTemplate.defaultValue = self.default_value
         sXMLTemplate.SXMLTemplate.separatorXml = self.sep_xmlnodes
         #photodata = dict(data)
         photodata = data
+        if missing != None:
+            photodata = sXMLTemplate.SXMLTemplate.TemplateDict(data, missing)
         for phototemkey, phototem in self.phototemplates.iteritems():
             node_data = None
             if tmptemplates and phototemkey in tmptemplates:
@@ -292,7 +370,10 @@ class KmlData(object):
             if node_data == None:
                 node_data = ''
                 mode, xmldom, content = phototem
-                if xmldom != None:
+                compiled = self.photocompiled.get(phototemkey)
+                if compiled != None:
+                    node_data = ''.join(compiled.renderChildren(photodata))
+                elif xmldom != None:
                     pdestemplate = sXMLTemplate.SXMLTemplate(xmldom.toxml())
                     pdestemplate.setRootInfo(photodata)
                     div_element = pdestemplate.getDom().documentElement
@@ -302,7 +383,32 @@ class KmlData(object):
                     node_data = content
             photodata[phototemkey] = node_data
         # data to template.
-        self.kml.setData(photodata)
+        if self.stream:
+            self._spoolData(photodata)
+        else:
+            self.kml.setData(photodata)
+
+
+    def _spoolData(self, data):
+        nodes = self.kml.renderStrings(data, _KmlData_INDENT, _KmlData_NEWLINE)
+        for parent, strings in nodes:
+            key = self.spoolmarks.get(id(parent))
+            if key == None:
+                # A mark where the nodes would be appended, writexml
+                # indents it like them.
+                indent = u''
+                node = parent
+                while node.nodeType == node.ELEMENT_NODE:
+                    indent += _KmlData_INDENT
+                    node = node.parentNode
+                mark = _KmlData_STREAM_MARK % len(self.spools)
+                parent.appendChild(self.kml.getDom().createComment(mark))
+                key = u"%s<!--%s-->%s" % (indent, mark, _KmlData_NEWLINE)
+                self.spools[key] = _KmlDataSpool()
+                self.spoolmarks[id(parent)] = key
+            spool = self.spools[key]
+            for string in strings:
+                spool.write(string)
 
 
     def getVariables(self, template_file):
@@ -311,7 +417,7 @@ class KmlData(object):
         try:
             fd = codecs.open(template_file, "r", encoding="utf-8")
             for line in fd:
-                for match in re.findall(r"%\(([a-zA-Z0-9_\.]+)\|?.*\).", line):
+                for match in re.findall(r"%\(([a-zA-Z0-9_\.]+)(?:\|[^\)]*)?\)", line):
                     if not match in matches:
                         matches.append(match)
         except:
@@ -333,4 +439,26 @@ class KmlData(object):
         return kmldom
 
 
+    def writeKml(self, fd, encoding="utf-8"):
+        """
+        Writes the KML (indented) to the file `fd`, with the nodes of the
+        streaming mode.
+        """
+        kmldom = self.kml.getDom()
+        if not self.spools:
+            kmldom.writexml(fd, u"", _KmlData_INDENT, _KmlData_NEWLINE, encoding)
+            return kmldom
+        writer = _KmlDataWriter(fd, self.spools)
+        kmldom.writexml(writer, u"", _KmlData_INDENT, _KmlData_NEWLINE, encoding)
+        # A mark not written as expected (one call with its indentation)
+        # would lose all its nodes.
+        missing = len(self.spools) - len(writer.copied)
+        if missing > 0:
+            dgettext = {'missing': missing, 'spools': len(self.spools)}
+            msg = _("Cannot write %(missing)d of %(spools)d streamed node lists, "
+                "their marks were not found in the KML.")
+            raise KmlDataError(msg % dgettext)
+        return kmldom
+
+
 # EOF
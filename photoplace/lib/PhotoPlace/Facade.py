@@ -548,10 +548,11 @@ class Facade(object):
         return None
 
 
-    def Geolocate(self):
+    def Geolocate(self, mode=PhotoPlace_Cfg_main_geolocatemode,
+        interpolate=PhotoPlace_Cfg_main_interpolatemode):
         if self.finalize:
             return None
-        geolocate = Actions.geolocateAction.Geolocate(self.state)
+        geolocate = Actions.geolocateAction.Geolocate(self.state, mode, interpolate)
         self._setObservers(geolocate)
         return geolocate
 
@@ -63,8 +63,9 @@ def getPixbuf(geophoto, size=PIXBUFSIZE_GEOPHOTOINFO, interpolation=Image.BILINE
     # Size transformations
     (width, height) = size
     mirror = im.resize((width, height), interpolation)
-    if 'Exif.Image.Orientation' in geophoto.exif.exif_keys:
-        orientation = geophoto.exif['Exif.Image.Orientation'].value
+    # Orientation read from Exif when the photo was loaded
+    if geophoto.orientation:
+        orientation = geophoto.orientation
         if orientation == 1:
             pass
         elif orientation == 2:
@@ -305,11 +306,12 @@ class PhotoInfoGUI(gobject.GObject):
                 model.append(ite, [ True, True, str(k), str(v), color, type(v), ''])
         color = TREEVIEWPHOTOINFO_GEOPHOTOEXIF_COLOR
         ite = model.append(None, [ False, False, _("Image EXIF Values"), None, color, None, None])
-        for k in geophoto.exif.exif_keys:
-            try:
-                model.append(ite, [ False, False, str(k), str(geophoto[k]), color, None, ''])
-            except:
-                pass
+        try:
+            tags = geophoto.getExifTags()
+        except:
+            tags = {}
+        for k in sorted(tags.keys()):
+            model.append(ite, [ False, False, str(k), tags[k], color, None, ''])
         self.treeview.expand_all()
 
     def next(self, widget=None, data=None):
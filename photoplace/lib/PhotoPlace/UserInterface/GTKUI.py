@@ -857,14 +857,13 @@ class PhotoPlaceGUI(InterfaceUI):
 
     def _load_geophoto(self, geophoto, main_iterator=None):
         color = TREEVIEWPHOTO_NORMAL_COLOR
-        previews = geophoto.exif.previews
+        preview = geophoto.getExifPreview()
         width, height = TREEVIEWPHOTO_PHOTOSIZE
         # Patch submitted by Noela's team
-        if previews :
+        if preview :
             loader = gtk.gdk.PixbufLoader('jpeg')
             loader.set_size(width, height)
-            largest = previews[-1]
-            loader.write(largest.data)
+            loader.write(preview)
             loader.close()
             pixbuf = loader.get_pixbuf()
         else :
@@ -879,14 +878,18 @@ class PhotoPlaceGUI(InterfaceUI):
         dgettext['ele'] = geophoto.ele
         tips = "%(path)s\n"
         try:
-            dgettext['author'] = geophoto["Exif.Image.Artist"]
-            tips = tips + _("# Author: %(author)s\n")
+            tags = geophoto.getExifTags(["Exif.Image.Artist", "Exif.Image.ImageDescription"])
         except:
+            tags = {}
+        if "Exif.Image.Artist" in tags:
+            dgettext['author'] = tags["Exif.Image.Artist"]
+            tips = tips + _("# Author: %(author)s\n")
+        else:
             dgettext['author'] = _("Unknown")
-        try:
-            dgettext['description'] = geophoto["Exif.Image.ImageDescription"]
+        if "Exif.Image.ImageDescription" in tags:
+            dgettext['description'] = tags["Exif.Image.ImageDescription"]
             tips = tips + _("# Description:\n %(description)s\n")
-        except:
+        else:
             dgettext['description'] = ''
         information = _("<b>%(name)s</b>\nDate: %(date)s\nTime: %(time)s") % dgettext
         if geophoto.toffset != 0:
@@ -1213,7 +1216,9 @@ class PhotoPlaceGUI(InterfaceUI):
 
     def action_geolocate(self):
         try:
-            geolocate = self.userfacade.Geolocate()
+            geolocate = self.userfacade.Geolocate(
+                self.userfacade.state['geolocatemode'],
+                self.userfacade.state['interpolatemode'])
             if geolocate:
                 geolocate.run()
             else:
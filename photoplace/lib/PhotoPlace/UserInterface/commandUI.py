@@ -172,7 +172,9 @@ class PhotoPlaceCOM(InterfaceUI):
 
     def action_geolocate(self):
         try:
-            geolocate = self.userfacade.Geolocate()
+            geolocate = self.userfacade.Geolocate(
+                self.userfacade.state['geolocatemode'],
+                self.userfacade.state['interpolatemode'])
             if geolocate:
                 geolocate.run()
             else:
@@ -56,6 +56,8 @@ PhotoPlace_PhotoPTIME = 'Photo.PTIME'
 PhotoPlace_PhotoWIDTH = 'Photo.WIDTH'
 PhotoPlace_PhotoHEIGHT = 'Photo.HEIGHT'
 PhotoPlace_PhotoZOOM = 'Photo.ZOOM'
+# Prefix of the Exif tags of the photo (pyexiv2 keys)
+PhotoPlace_ExifPREFIX = 'Exif.'
 
 PhotoPlace_ResourceURI = 'PhotoPlace.ResourceURI'
 PhotoPlace_NumPOINTS = 'PhotoPlace.NunPOINTS'
@@ -110,6 +112,14 @@ PhotoPlace_Cfg_main_maxdeltaseconds = 300
 PhotoPlace_Cfg_main_timeoffsetseconds = 0
 PhotoPlace_Cfg_main_photouri = ""
 PhotoPlace_Cfg_main_copymode = 2
+PhotoPlace_Cfg_main_loadworkers = 1
+PhotoPlace_Cfg_main_lazyexif = 1
+PhotoPlace_Cfg_main_copyworkers = 1
+PhotoPlace_Cfg_main_incremental = 0
+PhotoPlace_Cfg_main_streamkml = 0
+PhotoPlace_Cfg_main_compactgpx = 0
+PhotoPlace_Cfg_main_geolocatemode = 0
+PhotoPlace_Cfg_main_interpolatemode = 0
 PhotoPlace_Cfg_main_kmltemplate = "layout.template.kml"
 PhotoPlace_Cfg_main_templateseparatorkey = '|'
 PhotoPlace_Cfg_main_templatedefaultvalue = " "
@@ -132,11 +142,16 @@ Photoplace_Cfg_mode_gui = 1
 PhotoPlace_Cfg_dir = os.path.join(
     unicode(os.path.expanduser("~"), PLATFORMENCODING, 'ignore'), ".photoplace")
 PhotoPlace_Cfg_file = "photoplace.cfg"
+PhotoPlace_Cfg_ExifCacheFile = "exifcache.db"
+PhotoPlace_Cfg_ExportManifestFile = "photoplace.manifest"
 PhotoPlace_Cfg_fileextold = ".old"
 PhotoPlace_Cfg_altdir = "conf"
 PhotoPlace_Cfg_optionsep = "="
 PhotoPlace_Cfg_sectionsep = ":"
 PhotoPlace_Cfg_PhotoRegExp = re.compile(r"\.jpg$", re.I)
+# Files already compressed, they are stored in KMZ files without deflate.
+PhotoPlace_Cfg_ZipStoredRegExp = re.compile(
+    r"\.(jpe?g|png|gif|mp3|ogg|m4a|wav|mp4|avi|mov|zip|kmz|gz)$", re.I)
 PhotoPlace_Cfg_KmlTemplatePhoto_Path = ['kml.Document.Folder.Placemark']
 PhotoPlace_Cfg_KmlTemplateDescriptionPhoto_Path = "kml.document.folder.placemark.description"
 PhotoPlace_Cfg_TemplateDescriptionPhoto_File = "PhotoDescription.xhtml"
@@ -146,6 +161,15 @@ PhotoPlace_Cfg_ExifModes = {
     1 : _('overwrite'),
    -1 : _('nowrite')
 }
+PhotoPlace_Cfg_GeolocateModes = {
+    0 : _('search'),
+    1 : _('merge'),
+}
+PhotoPlace_Cfg_InterpolateModes = {
+    0 : _('nearest'),
+    1 : _('linear'),
+    2 : _('greatcircle'),
+}
 PhotoPlace_Cfg_LogModes = {
     "info"   : logging.INFO,
     "debug"  : logging.DEBUG,
@@ -172,10 +196,10 @@ PhotoPlace_Cfg_logtextviewformat = '%(asctime)s: %(levelname)-7s - %(name)-11s -
 PhotoPlace_Cfg_consoleloglevel = logging.INFO
 PhotoPlace_Cfg_consolelogformat = '* %(message)s'
 PhotoPlace_Cfg_quality = [
-    {'img': Image.NEAREST, 'zip': zipfile.ZIP_DEFLATED },
-    {'img': Image.BILINEAR, 'zip': zipfile.ZIP_DEFLATED },
-    {'img': Image.BICUBIC, 'zip': zipfile.ZIP_STORED },
-    {'img': Image.ANTIALIAS, 'zip': zipfile.ZIP_STORED }
+    {'img': Image.NEAREST, 'zip': zipfile.ZIP_DEFLATED, 'deflate': 1 },
+    {'img': Image.BILINEAR, 'zip': zipfile.ZIP_DEFLATED, 'deflate': 6 },
+    {'img': Image.BICUBIC, 'zip': zipfile.ZIP_STORED, 'deflate': 9 },
+    {'img': Image.ANTIALIAS, 'zip': zipfile.ZIP_STORED, 'deflate': 9 }
 ]
 PhotoPlace_FILE_DEF_EXTENSION = ".jpg"
 
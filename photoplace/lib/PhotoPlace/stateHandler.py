@@ -145,6 +145,14 @@ class State(object):
         self._timeoffsetseconds = PhotoPlace_Cfg_main_timeoffsetseconds
         self._exifmode = PhotoPlace_Cfg_main_exifmode
         self._copymode = PhotoPlace_Cfg_main_copymode
+        self._loadworkers = PhotoPlace_Cfg_main_loadworkers
+        self._lazyexif = PhotoPlace_Cfg_main_lazyexif
+        self._copyworkers = PhotoPlace_Cfg_main_copyworkers
+        self._incremental = PhotoPlace_Cfg_main_incremental
+        self._streamkml = PhotoPlace_Cfg_main_streamkml
+        self._compactgpx = PhotoPlace_Cfg_main_compactgpx
+        self._geolocatemode = PhotoPlace_Cfg_main_geolocatemode
+        self._interpolatemode = PhotoPlace_Cfg_main_interpolatemode
         self._version = PhotoPlace_Cfg_version
         self._photoinputdir = u''
         self._gpxinputfile = u''
@@ -193,6 +201,14 @@ class State(object):
             "quality",
             "jpgzoom",
             "copymode",
+            "loadworkers",
+            "lazyexif",
+            "copyworkers",
+            "incremental",
+            "streamkml",
+            "compactgpx",
+            "geolocatemode",
+            "interpolatemode",
         ]
         if k in keys:
             return getattr(self, '_' + k)
@@ -233,6 +249,22 @@ class State(object):
             self.set_jpgzoom(value)
         elif k == "copymode":
             self.set_copymode(value)
+        elif k == "loadworkers":
+            self.set_loadworkers(value)
+        elif k == "lazyexif":
+            self.set_lazyexif(value)
+        elif k == "copyworkers":
+            self.set_copyworkers(value)
+        elif k == "incremental":
+            self.set_incremental(value)
+        elif k == "streamkml":
+            self.set_streamkml(value)
+        elif k == "compactgpx":
+            self.set_compactgpx(value)
+        elif k == "geolocatemode":
+            self.set_geolocatemode(value)
+        elif k == "interpolatemode":
+            self.set_interpolatemode(value)
         elif k == 'logfile' or k == 'loglevel':
             self.options[k] = value
         else:
@@ -284,6 +316,14 @@ class State(object):
         self.set_jpgzoom()
         self.set_exifmode()
         self.set_copymode()
+        self.set_loadworkers()
+        self.set_lazyexif()
+        self.set_copyworkers()
+        self.set_incremental()
+        self.set_streamkml()
+        self.set_compactgpx()
+        self.set_geolocatemode()
+        self.set_interpolatemode()
         self.set_maxdeltaseconds()
         self.set_timeoffsetseconds()
         self.set_utczoneminutes()
@@ -756,4 +796,158 @@ class State(object):
         self._copymode = copymode
 
 
+    @DSynchronized()
+    def set_loadworkers(self, value=None):
+        loadworkers = PhotoPlace_Cfg_main_loadworkers
+        try:
+            if value != None:
+                loadworkers = int(value)
+            else:
+                loadworkers = int(self.options["loadworkers"])
+        except KeyError:
+            self.__logger.debug(_("Value of 'loadworkers' not defined in the "
+            "configuration file. Setting default value '%s'.") % loadworkers)
+        except ValueError as valueerror:
+            dgettext = {'error': str(valueerror), 'value': loadworkers }
+            self.__logger.warning(_("Value of 'loadworkers' incorrect: %(error)s. "
+            "Setting default value '%(value)s'.") % dgettext)
+        if loadworkers < 1:
+            loadworkers = PhotoPlace_Cfg_main_loadworkers
+        self._loadworkers = loadworkers
+
+
+    @DSynchronized()
+    def set_lazyexif(self, value=None):
+        lazyexif = PhotoPlace_Cfg_main_lazyexif
+        try:
+            if value != None:
+                lazyexif = int(value)
+            else:
+                lazyexif = int(self.options["lazyexif"])
+        except KeyError:
+            self.__logger.debug(_("Value of 'lazyexif' not defined in the "
+            "configuration file. Setting default value '%s'.") % lazyexif)
+        except ValueError as valueerror:
+            dgettext = {'error': str(valueerror), 'value': lazyexif }
+            self.__logger.warning(_("Value of 'lazyexif' incorrect: %(error)s. "
+            "Setting default value '%(value)s'.") % dgettext)
+        self._lazyexif = lazyexif
+
+
+    @DSynchronized()
+    def set_copyworkers(self, value=None):
+        copyworkers = PhotoPlace_Cfg_main_copyworkers
+        try:
+            if value != None:
+                copyworkers = int(value)
+            else:
+                copyworkers = int(self.options["copyworkers"])
+        except KeyError:
+            self.__logger.debug(_("Value of 'copyworkers' not defined in the "
+            "configuration file. Setting default value '%s'.") % copyworkers)
+        except ValueError as valueerror:
+            dgettext = {'error': str(valueerror), 'value': copyworkers }
+            self.__logger.warning(_("Value of 'copyworkers' incorrect: %(error)s. "
+            "Setting default value '%(value)s'.") % dgettext)
+        if copyworkers < 1:
+            copyworkers = PhotoPlace_Cfg_main_copyworkers
+        self._copyworkers = copyworkers
+
+
+    @DSynchronized()
+    def set_incremental(self, value=None):
+        incremental = PhotoPlace_Cfg_main_incremental
+        try:
+            if value != None:
+                incremental = int(value)
+            else:
+                incremental = int(self.options["incremental"])
+        except KeyError:
+            self.__logger.debug(_("Value of 'incremental' not defined in the "
+            "configuration file. Setting default value '%s'.") % incremental)
+        except ValueError as valueerror:
+            dgettext = {'error': str(valueerror), 'value': incremental }
+            self.__logger.warning(_("Value of 'incremental' incorrect: %(error)s. "
+            "Setting default value '%(value)s'.") % dgettext)
+        self._incremental = incremental
+
+
+    @DSynchronized()
+    def set_streamkml(self, value=None):
+        streamkml = PhotoPlace_Cfg_main_streamkml
+        try:
+            if value != None:
+                streamkml = int(value)
+            else:
+                streamkml = int(self.options["streamkml"])
+        except KeyError:
+            self.__logger.debug(_("Value of 'streamkml' not defined in the "
+            "configuration file. Setting default value '%s'.") % streamkml)
+        except ValueError as valueerror:
+            dgettext = {'error': str(valueerror), 'value': streamkml }
+            self.__logger.warning(_("Value of 'streamkml' incorrect: %(error)s. "
+            "Setting default value '%(value)s'.") % dgettext)
+        self._streamkml = streamkml
+
+
+    @DSynchronized()
+    def set_compactgpx(self, value=None):
+        compactgpx = PhotoPlace_Cfg_main_compactgpx
+        try:
+            if value != None:
+                compactgpx = int(value)
+            else:
+                compactgpx = int(self.options["compactgpx"])
+        except KeyError:
+            self.__logger.debug(_("Value of 'compactgpx' not defined in the "
+            "configuration file. Setting default value '%s'.") % compactgpx)
+        except ValueError as valueerror:
+            dgettext = {'error': str(valueerror), 'value': compactgpx }
+            self.__logger.warning(_("Value of 'compactgpx' incorrect: %(error)s. "
+            "Setting default value '%(value)s'.") % dgettext)
+        self._compactgpx = compactgpx
+
+
+    @DSynchronized()
+    def set_geolocatemode(self, value=None):
+        geolocatemode = PhotoPlace_Cfg_main_geolocatemode
+        try:
+            if value != None:
+                mode = int(value)
+            else:
+                mode = int(self.options["geolocatemode"])
+            if not mode in PhotoPlace_Cfg_GeolocateModes:
+                raise ValueError("mode in %s" % PhotoPlace_Cfg_GeolocateModes.keys())
+            geolocatemode = mode
+        except KeyError:
+            self.__logger.debug(_("Value of 'geolocatemode' not defined in the "
+            "configuration file. Setting default value '%s'.") % geolocatemode)
+        except ValueError as valueerror:
+            dgettext = {'error': str(valueerror), 'value': geolocatemode }
+            self.__logger.warning(_("Value of 'geolocatemode' incorrect: %(error)s. "
+            "Setting default value '%(value)s'.") % dgettext)
+        self._geolocatemode = geolocatemode
+
+
+    @DSynchronized()
+    def set_interpolatemode(self, value=None):
+        interpolatemode = PhotoPlace_Cfg_main_interpolatemode
+        try:
+            if value != None:
+                mode = int(value)
+            else:
+                mode = int(self.options["interpolatemode"])
+            if not mode in PhotoPlace_Cfg_InterpolateModes:
+                raise ValueError("mode in %s" % PhotoPlace_Cfg_InterpolateModes.keys())
+            interpolatemode = mode
+        except KeyError:
+            self.__logger.debug(_("Value of 'interpolatemode' not defined in the "
+            "configuration file. Setting default value '%s'.") % interpolatemode)
+        except ValueError as valueerror:
+            dgettext = {'error': str(valueerror), 'value': interpolatemode }
+            self.__logger.warning(_("Value of 'interpolatemode' incorrect: %(error)s. "
+            "Setting default value '%(value)s'.") % dgettext)
+        self._interpolatemode = interpolatemode
+
+
 # EOF
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#   Copyright 2010-2015 Jose Riguera Lopez <jriguera@gmail.com>
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+import sys
+import os
+import os.path
+import time
+import datetime
+import random
+import gettext
+gettext.install("photoplace")
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from PhotoPlace.Actions import loadPhotosAction
+
+
+# ####################
+# Benchmark Code !!!!!
+# ####################
+
+class Photo(object):
+    # Synthetic photo record, only 'time' is used to sort
+    def __init__(self, name, time):
+        self.name = name
+        self.time = time
+
+
+class State(object):
+    def __init__(self):
+        self.geophotos = []
+
+
+def genphotos(num_photos):
+    random.seed(num_photos)
+    start = datetime.datetime(2014, 12, 1, 8, 0, 0)
+    photos = []
+    for i in xrange(num_photos):
+        t = start + datetime.timedelta(seconds=random.randint(0, num_photos))
+        photos.append(Photo("photo%06d.jpg" % i, t))
+    return photos
+
+
+def insert(geophotos, photos):
+    # Previous implementation, one sorted insert per photo
+    for geophoto in photos:
+        position = 0
+        for photo in geophotos:
+            if geophoto.time <= photo.time:
+                geophotos.insert(position, geophoto)
+                break
+            position += 1
+        else:
+            geophotos.append(geophoto)
+    return geophotos
+
+
+def merge(geophotos, photos):
+    action = loadPhotosAction.LoadPhotos.__new__(loadPhotosAction.LoadPhotos)
+    action.state = State()
+    action.state.geophotos = geophotos
+    action._merge(list(photos))
+    return action.state.geophotos
+
+
+def benchmark(num_photos, old=True):
+    print "\n* LoadPhotos benchmark (%d synthetic photos)\n" % num_photos
+    photos = genphotos(num_photos)
+    half = num_photos // 2
+    results = []
+    modes = [("merge", merge)]
+    if old:
+        modes.append(("insert", insert))
+    for (mode, function) in modes:
+        t0 = time.time()
+        # new directory and then append another one
+        geophotos = function([], photos[:half])
+        geophotos = function(geophotos, photos[half:])
+        elapsed = time.time() - t0
+        results.append([photo.name for photo in geophotos])
+        print "Mode %-6s: %d photos in %.2f s" % (mode, len(geophotos), elapsed)
+    if len(results) > 1:
+        print "Same order: %s" % (results[0] == results[1])
+    print "\n* End Benchmark!\n"
+
+
+if __name__ == "__main__":
+    num_photos = 50000
+    if len(sys.argv) > 1:
+        num_photos = int(sys.argv[1])
+    # the old insert is quadratic, only compared with smaller sets
+    for n in [num_photos // 8, num_photos // 4]:
+        benchmark(n)
+    for n in [num_photos // 2, num_photos]:
+        benchmark(n, False)
+
+#EOF
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#   Copyright 2010-2015 Jose Riguera Lopez <jriguera@gmail.com>
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+import sys
+import os
+import os.path
+import random
+import tempfile
+import gettext
+gettext.install("photoplace")
+# like photoplace.py, all files are UTF-8
+reload(sys)
+sys.setdefaultencoding("utf-8")
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from PhotoPlace.DataTypes import kmlData
+from PhotoPlace.definitions import *
+
+TEMPLATES = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+    "..", "..", "..", "share", "templates")
+
+
+# ####################################################
+# Conformance of streaming mode (StreamKML) with DOM
+# ####################################################
+
+TEXTS = [u'', u'abc', u'caf\xe9 & <tea>', u'"quoted"', u']]>', u'a--b', u'50%']
+
+
+def genphotos(num_photos):
+    random.seed(num_photos)
+    photos = []
+    for i in xrange(num_photos):
+        data = {
+            'Photo.NAME': u'photo%04d.jpg' % i,
+            'Photo.URI': u'photos/photo%04d.jpg' % i,
+            'Photo.LAT': 42.0 + i * 1e-4,
+            'Photo.LON': -8.0 + i * 1e-4,
+            'Photo.ELE': 100.0,
+            'Title': random.choice(TEXTS),
+        }
+        if i % 3 == 0:
+            data['Description'] = random.choice(TEXTS)
+        photos.append(data)
+    return photos
+
+
+def kml(stream, photos):
+    kmldata = kmlData.KmlData(os.path.join(TEMPLATES, PhotoPlace_Cfg_main_kmltemplate),
+        PhotoPlace_Cfg_KmlTemplatePhoto_Path, 'conformance', stream=stream)
+    kmldata.setTemplates({
+        PhotoPlace_Cfg_KmlTemplateDescriptionPhoto_Path:
+            os.path.join(TEMPLATES, PhotoPlace_Cfg_TemplateDescriptionPhoto_File),
+        'kml.document.folder.description':
+            os.path.join(TEMPLATES, 'GlobalDescription.xhtml'),
+    })
+    for data in photos:
+        kmldata.setData(dict(data))
+    kmldata.close({'Name': u'Conformance'})
+    return kmldata
+
+
+def write(kmldata):
+    # a file, like SaveFiles (the spools write UTF-8 bytes)
+    fd = tempfile.TemporaryFile()
+    try:
+        kmldata.writeKml(fd, "utf-8")
+        fd.seek(0)
+        return fd.read()
+    finally:
+        fd.close()
+
+
+def test(num_photos=200):
+    print "\n* KmlData streaming mode conformance\n"
+    errors = 0
+    photos = genphotos(num_photos)
+    expected = write(kml(False, photos))
+    got = write(kml(True, photos))
+    if expected != got:
+        errors += 1
+        print "ERROR streaming output differs from DOM output (%d != %d bytes)" % \
+            (len(got), len(expected))
+    else:
+        print "%d photos, %d bytes, same output" % (num_photos, len(got))
+    # A mark not found by the writer (e.g. other indentation) must fail
+    kmldata = kml(True, photos)
+    for key in kmldata.spools.keys():
+        kmldata.spools[u'\t' + key] = kmldata.spools.pop(key)
+    try:
+        write(kmldata)
+        errors += 1
+        print "ERROR lost streamed nodes were not detected"
+    except kmlData.KmlDataError as e:
+        print "Lost streamed nodes detected: %s" % e
+    print "\n* End Tests!\n"
+    return errors
+
+
+if __name__ == "__main__":
+    num_photos = 200
+    if len(sys.argv) > 1:
+        num_photos = int(sys.argv[1])
+    sys.exit(1 if test(num_photos) else 0)
+
+#EOF
@@ -40,6 +40,10 @@ __package_copyright__ ="(c) Jose Riguera"
 
 
 import math
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 EarthsRadius     = 6378137.0    # Earth's radius =~ 6371km
@@ -102,6 +106,40 @@ def distanceCoord (lat0, lon0, lat1, lon1):
     return (EarthsRadius * c)
 
 
+def distancesCoord (lats, lons):
+    """
+    Distances in meters between each pair of consecutive points given by
+    the sequences of latitudes and longitudes. With NumPy the result is
+    an array computed in a vectorized way, otherwise a list.
+    """
+    if numpy != None:
+        lats = numpy.radians(numpy.asarray(lats, dtype=numpy.float64))
+        lons = numpy.radians(numpy.asarray(lons, dtype=numpy.float64))
+        sLat = numpy.sin(numpy.diff(lats) / 2.0)
+        sLon = numpy.sin(numpy.diff(lons) / 2.0)
+        cLat = numpy.cos(lats)
+        a = sLat * sLat + cLat[:-1] * cLat[1:] * sLon * sLon
+        # error correction for rounding errors.
+        a = numpy.minimum(a, 1.0)
+        c = 2.0 * numpy.arctan2(numpy.sqrt(a), numpy.sqrt(1.0 - a))
+        return (EarthsRadius * c)
+    distances = []
+    for pos in xrange(1, len(lats)):
+        distance = distanceCoord(lats[pos - 1], lons[pos - 1], lats[pos], lons[pos])
+        distances.append(distance)
+    return distances
+
+
+def cartesianCoord (lat, lon):
+    """
+    Cartesian coordinates (x, y, z) of a point on the unit sphere.
+    """
+    rlat = math.radians(lat)
+    rlon = math.radians(lon)
+    cos_lat = math.cos(rlat)
+    return (cos_lat * math.cos(rlon), cos_lat * math.sin(rlon), math.sin(rlat))
+
+
 def moveCoord (latitude, longitude, distance, bearing):
     """
     Calculate next point at distance with bearing.
@@ -133,6 +171,30 @@ def bearingCoord (lat0, lon0, lat1, lon1):
     return bearing
 
 
+def interpolateCoord (lat0, lon0, lat1, lon1, fraction, greatcircle=True):
+    """
+    Intermediate point at `fraction` (0.0 .. 1.0) of the way between two points,
+    following the great circle path or interpolating the coordinates linearly.
+    """
+    if greatcircle:
+        distance = distanceCoord(lat0, lon0, lat1, lon1)
+        bearing = bearingCoord(lat0, lon0, lat1, lon1)
+        (lat, lon) = moveCoord(lat0, lon0, distance * fraction, bearing)
+    else:
+        dLon = lon1 - lon0
+        if dLon > 180.0:
+            dLon = dLon - 360.0
+        elif dLon < -180.0:
+            dLon = dLon + 360.0
+        lat = lat0 + (lat1 - lat0) * fraction
+        lon = lon0 + dLon * fraction
+    if lon > 180.0:
+        lon = lon - 360.0
+    elif lon < -180.0:
+        lon = lon + 360.0
+    return (lat, lon)
+
+
 def bestViewAltitude(max_lat, max_lon, min_lat, min_lon, scale_range=1.5, aspect_ratio=1.5):
     """
     Calculate the best altitude to see the points.
@@ -159,61 +221,110 @@ def bestViewAltitude(max_lat, max_lon, min_lat, min_lon, scale_range=1.5, aspect
     return altitude
 
 
-def simplDouglasPeucker(points, epsilon):
+# Minimum number of intermediate points to compute deviations with NumPy,
+# for smaller ranges the overhead of creating arrays is bigger.
+SimplDouglasPeucker_NUMPY_MIN = 32
+
+
+def _maxDeviation(lats, lons, start, end, F):
+    # most distant intermediate point with the line from start to end points
+    x12 = (lons[end] - lons[start])
+    y12 = (lats[end] - lats[start])
+    if math.fabs(x12) > 180.0:
+        x12 = 360.0 - math.fabs(x12)
+    x12 *= math.cos(F * (lats[end] + lats[start]))
+    d12 = (x12*x12) + (y12*y12)
+    sig = start
+    max_dev_sqr = -1.0
+    for i in xrange(start + 1, end):
+        x13 = (lons[i] - lons[start])
+        y13 = (lats[i] - lats[start])
+        if math.fabs(x13) > 180.0:
+            x13 = 360.0 - math.fabs(x13)
+        x13 *= math.cos(F * (lats[i] + lats[start]))
+        d13 = (x13*x13) + (y13*y13)
+        x23 = (lons[i] - lons[end])
+        y23 = (lats[i] - lats[end])
+        if math.fabs(x23) > 180.0:
+            x23 = 360.0 - math.fabs(x23)
+        x23 *= math.cos(F * (lats[i] + lats[end]))
+        d23 = (x23*x23) + (y23*y23)
+        if d13 >= (d12 + d23):
+            dev_sqr = d23
+        elif d23 >= (d12 + d13):
+            dev_sqr = d13
+        else:
+            # solve triangle
+            dev_sqr = (x13 * y12 - y13 * x12) * (x13 * y12 - y13 * x12) / d12
+        if dev_sqr > max_dev_sqr:
+            sig = i;
+            max_dev_sqr = dev_sqr;
+    return (sig, max_dev_sqr)
+
+
+def _maxDeviationNumpy(lats, lons, start, end, F):
+    # same as _maxDeviation, all intermediate points at once
+    x12 = float(lons[end] - lons[start])
+    y12 = float(lats[end] - lats[start])
+    if math.fabs(x12) > 180.0:
+        x12 = 360.0 - math.fabs(x12)
+    x12 *= math.cos(F * (lats[end] + lats[start]))
+    d12 = (x12*x12) + (y12*y12)
+    lat = lats[start + 1:end]
+    lon = lons[start + 1:end]
+    x13 = lon - lons[start]
+    x13 = numpy.where(numpy.fabs(x13) > 180.0, 360.0 - numpy.fabs(x13), x13)
+    x13 *= numpy.cos(F * (lat + lats[start]))
+    y13 = lat - lats[start]
+    d13 = (x13*x13) + (y13*y13)
+    x23 = lon - lons[end]
+    x23 = numpy.where(numpy.fabs(x23) > 180.0, 360.0 - numpy.fabs(x23), x23)
+    x23 *= numpy.cos(F * (lat + lats[end]))
+    y23 = lat - lats[end]
+    d23 = (x23*x23) + (y23*y23)
+    if d12 > 0.0:
+        # solve triangle
+        cross = (x13 * y12 - y13 * x12)
+        dev_sqr = cross * cross / d12
+    else:
+        # start and end are the same point, one of the other cases applies
+        dev_sqr = numpy.zeros(len(lat))
+    dev_sqr = numpy.where(d23 >= (d12 + d13), d13, dev_sqr)
+    dev_sqr = numpy.where(d13 >= (d12 + d23), d23, dev_sqr)
+    pos = int(numpy.argmax(dev_sqr))
+    return (start + 1 + pos, float(dev_sqr[pos]))
+
+
+def simplDouglasPeuckerIndex(lats, lons, epsilon):
     """
-    The Ramer–Douglas–Peucker algorithm (RDP) is an algorithm for reducing the
-    number of points in a curve that is approximated by a series of points.
+    Ramer-Douglas-Peucker simplification over sequences of latitudes and
+    longitudes. Returns the indexes of the points kept. Deviations of the
+    intermediate points are computed in a vectorized way with NumPy (if
+    available).
     """
     # epsilon depth in meters is the maximum allowed distance between the poin,
     # and the paht. It is the height of the triangle abc where a-b and b-c are
     # two consecutive line segments
-    len_points = len(points)
+    len_points = len(lats)
     # indexes of points to include in the simplification
     index = []
     # if one or two points ...
     if len_points < 3:
-        return points
+        return range(len_points)
     band_sqr = epsilon * 360.0 / (2.0 * math.pi * EarthsRadius)
     band_sqr = band_sqr * band_sqr
     F = math.pi / 360.0
+    if numpy != None:
+        np_lats = numpy.asarray(lats, dtype=numpy.float64)
+        np_lons = numpy.asarray(lons, dtype=numpy.float64)
     stack = [(0, len_points-1)]
     while stack:
         start, end = stack.pop()
         if (end - start) > 1:
-            # intermediate points, find most distant intermediate point
-            # with the line from start to end points
-            x12 = (points[end].lon - points[start].lon)
-            y12 = (points[end].lat - points[start].lat)
-            if math.fabs(x12) > 180.0:
-                x12 = 360.0 - math.fabs(x12)
-            x12 *= math.cos(F * (points[end].lat + points[start].lat))
-            d12 = (x12*x12) + (y12*y12)
-
-            sig = start
-            max_dev_sqr = -1.0
-            for i in xrange(start + 1, end):
-                x13 = (points[i].lon - points[start].lon)
-                y13 = (points[i].lat - points[start].lat)
-                if math.fabs(x13) > 180.0:
-                    x13 = 360.0 - math.fabs(x13)
-                x13 *= math.cos(F * (points[i].lat + points[start].lat))
-                d13 = (x13*x13) + (y13*y13)
-                x23 = (points[i].lon - points[end].lon)
-                y23 = (points[i].lat - points[end].lat)
-                if math.fabs(x23) > 180.0:
-                    x23 = 360.0 - math.fabs(x23)
-                x23 *= math.cos(F * (points[i].lat + points[end].lat))
-                d23 = (x23*x23) + (y23*y23)
-                if d13 >= (d12 + d23):
-                    dev_sqr = d23
-                elif d23 >= (d12 + d13):
-                    dev_sqr = d13
-                else:
-                    # solve triangle
-                    dev_sqr = (x13 * y12 - y13 * x12) * (x13 * y12 - y13 * x12) / d12
-                if dev_sqr > max_dev_sqr:
-                    sig = i;
-                    max_dev_sqr = dev_sqr;
+            if numpy != None and (end - start) > SimplDouglasPeucker_NUMPY_MIN:
+                sig, max_dev_sqr = _maxDeviationNumpy(np_lats, np_lons, start, end, F)
+            else:
+                sig, max_dev_sqr = _maxDeviation(lats, lons, start, end, F)
             if max_dev_sqr < band_sqr:
                 # no sig. intermediate point, transfer current start point
                 index.append(start)
@@ -224,6 +335,19 @@ def simplDouglasPeucker(points, epsilon):
             index.append(start)
     # last point
     index.append(len_points-1)
+    return index
+
+
+def simplDouglasPeucker(points, epsilon):
+    """
+    The Ramer–Douglas–Peucker algorithm (RDP) is an algorithm for reducing the
+    number of points in a curve that is approximated by a series of points.
+    """
+    if len(points) < 3:
+        return points
+    lats = [point.lat for point in points]
+    lons = [point.lon for point in points]
+    index = simplDouglasPeuckerIndex(lats, lons, epsilon)
     return [points[i] for i in index]
 
 
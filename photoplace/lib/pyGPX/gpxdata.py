@@ -29,6 +29,12 @@ __package_copyright__ ="(c) Jose Riguera"
 
 import time
 import datetime
+import bisect
+import array
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 __GPX_version__ = "1.1"
 __GPX_creator__ = "GPX4PhotoPlace"
@@ -58,6 +64,23 @@ import exceptions
 import geomath
 
 
+_GPX_EPOCH = datetime.datetime(1970, 1, 1)
+
+def deltaToSeconds(delta):
+    """
+    Seconds (float) of a 'timedelta'.
+    """
+    return delta.days * 86400.0 + delta.seconds + delta.microseconds / 1000000.0
+
+
+def timeToSeconds(dt):
+    """
+    Seconds (float) from the Unix epoch of a naive UTC 'datetime'. It is
+    used as key for the time indexes of segments and tracks.
+    """
+    return deltaToSeconds(dt - _GPX_EPOCH)
+
+
 
 # #############################
 # GPX point Type implementation
@@ -190,6 +213,95 @@ class GPXPoint(GPXItem):
         return geomath.bearingCoord(self.lat, self.lon, lat, lon)
 
 
+def interpolatePoint(prev_point, next_point, time, greatcircle=True):
+    """
+    New GPXPoint at `time` interpolated between two (time ordered) points.
+    """
+    span = deltaToSeconds(next_point.time - prev_point.time)
+    if span <= 0.0 or time <= prev_point.time:
+        fraction = 0.0
+    elif time >= next_point.time:
+        fraction = 1.0
+    else:
+        fraction = deltaToSeconds(time - prev_point.time) / span
+    (lat, lon) = geomath.interpolateCoord(prev_point.lat, prev_point.lon,
+        next_point.lat, next_point.lon, fraction, greatcircle)
+    ele = prev_point.ele + (next_point.ele - prev_point.ele) * fraction
+    return GPXPoint(lat, lon, ele, time, {})
+
+
+class GPXPointIndex(object):
+    """
+    KD-tree with the cartesian coordinates of points on the unit sphere, to
+    find the nearest point to a position in logarithmic time. The chord
+    distance grows with the great circle distance, so the nearest point is
+    the same.
+    """
+    def __init__(self, lats, lons):
+        """GPX Point Index class constructor
+
+        :Parameters:
+            -`lats`: sequence of latitudes.
+            -`lons`: sequence of longitudes (same length).
+        """
+        nodes = []
+        for pos in xrange(len(lats)):
+            (x, y, z) = geomath.cartesianCoord(lats[pos], lons[pos])
+            nodes.append((x, y, z, pos))
+        # median of each range (split by x, y, z in turns) goes in the middle
+        stack = [(0, len(nodes), 0)]
+        while stack:
+            (low, high, axis) = stack.pop()
+            if high - low < 2:
+                continue
+            nodes[low:high] = sorted(nodes[low:high], key=lambda node: node[axis])
+            middle = (low + high) // 2
+            axis = (axis + 1) % 3
+            stack.append((low, middle, axis))
+            stack.append((middle + 1, high, axis))
+        self.nodes = nodes
+
+
+    def __len__(self):
+        return len(self.nodes)
+
+
+    def nearest(self, lat, lon):
+        """
+        Position (in the sequences given to the constructor) of the nearest
+        point to lat, lon. It is -1 if there are no points.
+        """
+        nodes = self.nodes
+        query = geomath.cartesianCoord(lat, lon)
+        nearest = -1
+        min_distance = 5.0
+        # ranges to visit, with the min. distance from the query to them
+        stack = [(0, len(nodes), 0, 0.0)]
+        while stack:
+            (low, high, axis, bound) = stack.pop()
+            if low >= high or bound > min_distance:
+                continue
+            middle = (low + high) // 2
+            node = nodes[middle]
+            dx = query[0] - node[0]
+            dy = query[1] - node[1]
+            dz = query[2] - node[2]
+            distance = dx * dx + dy * dy + dz * dz
+            if distance < min_distance or (distance == min_distance and node[3] < nearest):
+                min_distance = distance
+                nearest = node[3]
+            diff = query[axis] - node[axis]
+            next_axis = (axis + 1) % 3
+            if diff < 0:
+                stack.append((middle + 1, high, next_axis, diff * diff))
+                stack.append((low, middle, next_axis, 0.0))
+            else:
+                stack.append((low, middle, next_axis, diff * diff))
+                stack.append((middle + 1, high, next_axis, 0.0))
+        return nearest
+
+
+
 # ###############################
 # GPX Segment Type implementation
 # ###############################
@@ -209,6 +321,9 @@ class GPXSegment(GPXItem):
         self.name = name
         self.attr = attr
         self.lwpts = []
+        self._tindex = None
+        self._stats = None
+        self._sindex = None
         for wpt in lwpts:
             self.addPoint(wpt)
 
@@ -221,34 +336,99 @@ class GPXSegment(GPXItem):
         return "GPXSegment name=%s, attr=%s :\n\t%s" % (self.name, self.attr, self.lwpts)
 
 
+    @classmethod
+    def fromPoints(cls, name, lwpts, attr={}):
+        """
+        Bulk constructor. The list of points can be unsorted, it is sorted
+        only once and points with repeated times are discarded.
+
+        :Parameters:
+            -`name`: identifier for this track segment.
+            -`lwpts`: List of points.
+            -`attr`: Dictionary type with other data.
+        """
+        trkseg = cls(name, attr)
+        trkseg.addPoints(lwpts)
+        return trkseg
+
+
     def addPoint(self, wpt):
         if not isinstance(wpt, GPXPoint):
             dgettext = {'type_expected': GPXPoint.__name__, 'type_got': wpt.__class__.__name__}
             msg = _("Point type excepted '%(type_expected)s', got '%(type_got)s' instead")
             raise TypeError(msg % dgettext)
-        pos = 0
+        self._stats = None
+        self._sindex = None
         num_points = len(self.lwpts)
         if num_points < 1:
+            self._tindex = None
             self.lwpts.append(wpt)
-        else:
-            if wpt.time > self.lwpts[num_points - 1].time:
-                self.lwpts.append(wpt)
-                pos = num_points
+            return 0
+        last_time = self.lwpts[num_points - 1].time
+        if wpt.time > last_time:
+            if self._tindex is not None and len(self._tindex) == num_points:
+                self._tindex.append(timeToSeconds(wpt.time))
             else:
-                for pos in xrange(0, num_points):
-                    if wpt.time < self.lwpts[pos].time:
-                        self.lwpts.insert(pos, wpt)
-                        break
+                self._tindex = None
+            self.lwpts.append(wpt)
+            return num_points
+        if wpt.time == last_time:
+            # same time than the last point, it is discarded
+            return num_points - 1
+        tindex = self.timeIndex()
+        seconds = timeToSeconds(wpt.time)
+        pos = bisect.bisect_right(tindex, seconds)
+        self.lwpts.insert(pos, wpt)
+        tindex.insert(pos, seconds)
         return pos
 
 
+    def addPoints(self, lwpts):
+        """
+        Adds a list of points (unsorted) to the segment sorting all the
+        points once. Only the first point (existing ones go first) of each
+        time is kept.
+        """
+        for wpt in lwpts:
+            if not isinstance(wpt, GPXPoint):
+                dgettext = {'type_expected': GPXPoint.__name__, 'type_got': wpt.__class__.__name__}
+                msg = _("Point type excepted '%(type_expected)s', got '%(type_got)s' instead")
+                raise TypeError(msg % dgettext)
+        points = sorted(self.lwpts + list(lwpts), key=lambda wpt: wpt.time)
+        self.lwpts = []
+        self._tindex = None
+        self._stats = None
+        self._sindex = None
+        last_time = None
+        for wpt in points:
+            if wpt.time != last_time:
+                self.lwpts.append(wpt)
+                last_time = wpt.time
+        return len(self.lwpts)
+
+
     def delPoint(self, pos):
         if pos >= 0 and pos < len(self.lwpts):
             del self.lwpts[pos]
+            self._tindex = None
+            self._stats = None
+            self._sindex = None
         else:
             raise exceptions.GPXErrorSegment(_("Cannot delete point at pos %s!") % pos)
 
 
+    def changed(self):
+        """
+        Resets the cached indexes and statistics of the segment. The methods
+        adding or deleting points do it, call it after changing points in
+        place (position or time of a point). The count of points is also
+        checked, for points added to 'lwpts' directly.
+        """
+        self._tindex = None
+        self._stats = None
+        self._sindex = None
+
+
     def position(self, wpt):
         if not isinstance(wpt, GPXPoint):
             dgettext = {'type_expected': GPXPoint.__name__, 'type_got': wpt.__class__.__name__}
@@ -262,76 +442,147 @@ class GPXSegment(GPXItem):
         return -1
 
 
-    # Perfecto!, funciona por diferencias!!
-    def closest(self, time):
-        if time < self.lwpts[0].time:
-            return self.lwpts[0]
+    def timeIndex(self):
+        """
+        Sorted list with the time of each point (seconds from epoch). It is
+        built once and rebuilt only when the segment changes.
+        """
+        if self._tindex is None or len(self._tindex) != len(self.lwpts):
+            self._tindex = [timeToSeconds(point.time) for point in self.lwpts]
+        return self._tindex
+
+
+    def bracket(self, time):
+        """
+        Returns the two points (previous, next) surrounding `time`. At the
+        edges of the segment both points are the same (first or last one).
+        """
+        tindex = self.timeIndex()
+        pos = bisect.bisect_left(tindex, timeToSeconds(time))
+        if pos <= 0:
+            return (self.lwpts[0], self.lwpts[0])
         last = len(self.lwpts) - 1
-        if time > self.lwpts[last].time:
-            return self.lwpts[last]
-        pdiff = datetime.timedelta.max
-        for pos in xrange(0, last):
-            point = self.lwpts[pos]
-            diff = abs(point.time - time)
-            if diff > pdiff:
-                return self.lwpts[pos - 1]
-            pdiff = diff
-        # with only one point
-        return self.lwpts[0]
+        if pos > last:
+            return (self.lwpts[last], self.lwpts[last])
+        return (self.lwpts[pos - 1], self.lwpts[pos])
+
+
+    def closest(self, time):
+        (prev_point, next_point) = self.bracket(time)
+        if abs(next_point.time - time) < abs(time - prev_point.time):
+            return next_point
+        return prev_point
+
+
+    def pointIndex(self):
+        """
+        Spatial index (GPXPointIndex) of the points. It is built once and
+        rebuilt only when the segment changes (see 'changed').
+        """
+        if self._sindex is None or len(self._sindex) != len(self.lwpts):
+            (lat, lon, ele, time) = self.columns()
+            self._sindex = GPXPointIndex(lat, lon)
+        return self._sindex
 
 
     def nearestPointDistance(self, lat, lon):
+        """
+        Nearest point to lat, lon and its distance. The query uses the
+        spatial index of the segment (built with the first query).
+        """
         min_distance = geomath.MaxDistanceEarth
         nearest = None
-        for point in self.lwpts:
-            distance = point.distance(lat, lon)
-            if distance < min_distance :
-                min_distance = distance
-                nearest = point
+        pos = self.pointIndex().nearest(lat, lon)
+        if pos >= 0:
+            nearest = self.lwpts[pos]
+            min_distance = nearest.distance(lat, lon)
         return (nearest, min_distance)
 
 
-    def length(self):
-        total_distance = 0
+    def columns(self):
+        """
+        Returns the (lat, lon, ele, time) columns, time in seconds from epoch.
+        They are NumPy arrays if NumPy is available.
+        """
+        lat = [point.lat for point in self.lwpts]
+        lon = [point.lon for point in self.lwpts]
+        ele = [point.ele for point in self.lwpts]
+        time = self.timeIndex()
+        if numpy != None:
+            return tuple(numpy.array(column, dtype=numpy.float64) \
+                for column in (lat, lon, ele, time))
+        return (lat, lon, ele, time)
+
+
+    def statistics(self):
+        """
+        Dictionary with 'length', 'speed' (min, avg, max), 'coord' ((min_lat,
+        min_lon), (max_lat, max_lon)) and 'elevation' (min, max) of the
+        segment. All of them are computed together in one pass (vectorized
+        with NumPy if available) and cached until the segment changes (see
+        'changed').
+        """
         num_points = len(self.lwpts)
+        if self._stats is not None and self._stats['points'] == num_points:
+            return self._stats
+        stats = {
+            'points': num_points,
+            'length': 0.0,
+            'speed': (0.0, 0.0, 0.0),
+            'coord': ((90.0, 180.0), (-90.0, -180.0)),
+            'elevation': (9000.0, -12000.0),
+        }
+        if num_points > 0:
+            (lat, lon, ele, time) = self.columns()
+            if numpy != None:
+                stats['coord'] = ((float(lat.min()), float(lon.min())),
+                    (float(lat.max()), float(lon.max())))
+                stats['elevation'] = (float(ele.min()), float(ele.max()))
+            else:
+                stats['coord'] = ((min(lat), min(lon)), (max(lat), max(lon)))
+                stats['elevation'] = (min(ele), max(ele))
         if num_points > 1:
-            pos = 1
-            while pos <= num_points - 1 :
-                point = self.lwpts[pos]
-                prev_point = self.lwpts[pos - 1]
-                total_distance += point.distance(prev_point)
-                pos = pos + 1
-        return total_distance
+            distances = geomath.distancesCoord(lat, lon)
+            min_speed = 0.0
+            max_speed = 0.0
+            if numpy != None:
+                length = float(distances.sum())
+                dtimes = numpy.diff(time)
+                valid = dtimes > 0
+                speeds = distances[valid] / dtimes[valid]
+                if len(speeds) > 0:
+                    min_speed = float(speeds.min())
+                    max_speed = float(speeds.max())
+            else:
+                length = float(sum(distances))
+                speeds = []
+                for pos in xrange(1, num_points):
+                    dtime = time[pos] - time[pos - 1]
+                    if dtime > 0:
+                        speeds.append(distances[pos - 1] / dtime)
+                if len(speeds) > 0:
+                    min_speed = min(speeds)
+                    max_speed = max(speeds)
+            avg_speed = 0.0
+            duration = time[num_points - 1] - time[0]
+            if duration > 0:
+                avg_speed = length / duration
+            stats['length'] = length
+            stats['speed'] = (min_speed, avg_speed, max_speed)
+        self._stats = stats
+        return stats
+
+
+    def length(self):
+        return self.statistics()['length']
 
 
     def coordMinMax(self):
-        max_lat = -90.0
-        min_lat = 90.0
-        max_lon = -180.0
-        min_lon = 180.0
-        if len(self.lwpts) > 0:
-            for point in self.lwpts:
-                if point.lat > max_lat:
-                    max_lat = point.lat
-                if point.lat < min_lat:
-                    min_lat = point.lat
-                if point.lon > max_lon:
-                    max_lon = point.lon
-                if point.lon < min_lon:
-                    min_lon = point.lon
-        return ((min_lat, min_lon), (max_lat, max_lon))
+        return self.statistics()['coord']
 
 
     def elevationMinMax(self):
-        max_ele = -12000.0
-        min_ele = 9000.0
-        if len(self.lwpts) > 0:
-            for point in self.lwpts:
-                if point.ele > max_ele:
-                    max_ele = point.ele
-                if point.ele < min_ele:
-                    min_ele = point.ele
-        return (min_ele, max_ele)
+        return self.statistics()['elevation']
 
 
     def timeMinMax(self):
@@ -345,35 +596,197 @@ class GPXSegment(GPXItem):
 
 
     def speedMinAvgMax(self):
-        total_distance = 0.0
-        min_speed = 0.0
-        max_speed = 0.0
-        avg_speed = 0.0
-        num_points = len(self.lwpts)
-        if num_points > 1:
-            pos = 1
-            while pos <= num_points - 1:
-                point = self.lwpts[pos]
-                prev_point = self.lwpts[pos - 1]
-                distance = point.distance(prev_point)
-                total_distance = total_distance + distance
-                diff_time = point.time - prev_point.time
-                t = diff_time.seconds * 1000000 + diff_time.microseconds
-                speed = (float(distance) / float(t)) * 1000000
-                if pos == 1:
-                    min_speed = speed
-                    max_speed = speed
-                if speed > max_speed:
-                    max_speed = speed
-                if speed < min_speed:
-                    min_speed = speed
-                pos = pos + 1
-            min_date = self.lwpts[0].time
-            max_date = self.lwpts[num_points - 1].time
-            diff_time = max_date - min_date
-            t = diff_time.seconds * 1000000 + diff_time.microseconds
-            avg_speed = (float(total_distance) / float(t)) * 1000000
-        return (min_speed, avg_speed, max_speed)
+        return self.statistics()['speed']
+
+
+# #######################################
+# GPX Compact Segment Type implementation
+# #######################################
+
+class GPXPointList(object):
+    """
+    Read only sequence of the points of a GPXCompactSegment. The GPXPoint
+    objects are created on demand, when they are accessed.
+    """
+    def __init__(self, trkseg):
+        self.trkseg = trkseg
+
+
+    def __len__(self):
+        return len(self.trkseg._time)
+
+
+    def __getitem__(self, index):
+        num_points = len(self.trkseg._time)
+        if isinstance(index, slice):
+            return [ self.trkseg.point(pos) for pos in xrange(*index.indices(num_points)) ]
+        if index < 0:
+            index += num_points
+        if index < 0 or index >= num_points:
+            raise IndexError(_("Point index %s out of range!") % index)
+        return self.trkseg.point(index)
+
+
+    def __iter__(self):
+        for pos in xrange(len(self.trkseg._time)):
+            yield self.trkseg.point(pos)
+
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+
+class GPXCompactSegment(GPXSegment):
+    """
+    GPX track segment which stores only lat, lon, ele and time of each point
+    in 'array' columns. 'lwpts' is a read only sequence of GPXPoint created
+    on demand, so changes on those points are not stored.
+    """
+    def __init__(self, name, attr={}, lwpts=[]):
+        """GPX Compact Track Seg class constructor
+
+        :Parameters:
+            -`name`: identifier for this track segment.
+            -`attr`: Dictionary type with other data.
+            -`lwpts`: List of points.
+        """
+        self.name = name
+        self.attr = attr
+        self._lat = array.array('d')
+        self._lon = array.array('d')
+        self._ele = array.array('d')
+        self._time = array.array('d')
+        self._tindex = None
+        self._stats = None
+        self._sindex = None
+        for wpt in lwpts:
+            self.addPoint(wpt)
+
+
+    @property
+    def lwpts(self):
+        return GPXPointList(self)
+
+
+    def point(self, pos):
+        time = _GPX_EPOCH + datetime.timedelta(seconds=self._time[pos])
+        return GPXPoint(self._lat[pos], self._lon[pos], self._ele[pos], time, {})
+
+
+    def columns(self):
+        """
+        Returns the (lat, lon, ele, time) columns, time in seconds from epoch.
+        They are NumPy arrays if NumPy is available, copies of the columns
+        (not views, the arrays can grow): 32 bytes per point and one memory
+        copy each call, about 32 MB for a million points. Without NumPy the
+        'array' columns of the segment are returned, do not change them.
+        """
+        if numpy != None and len(self._time) > 0:
+            return tuple(numpy.frombuffer(column, dtype=numpy.float64).copy() \
+                for column in (self._lat, self._lon, self._ele, self._time))
+        return (self._lat, self._lon, self._ele, self._time)
+
+
+    def appendPoint(self, lat, lon, ele, seconds):
+        """
+        Adds a point from its values, without creating a GPXPoint. Same
+        rules as 'addPoint'.
+        """
+        self._stats = None
+        self._sindex = None
+        num_points = len(self._time)
+        if num_points < 1 or seconds > self._time[num_points - 1]:
+            pos = num_points
+            self._lat.append(lat)
+            self._lon.append(lon)
+            self._ele.append(ele)
+            self._time.append(seconds)
+        elif seconds == self._time[num_points - 1]:
+            # same time than the last point, it is discarded
+            return num_points - 1
+        else:
+            pos = bisect.bisect_right(self._time, seconds)
+            self._lat.insert(pos, lat)
+            self._lon.insert(pos, lon)
+            self._ele.insert(pos, ele)
+            self._time.insert(pos, seconds)
+        return pos
+
+
+    def addPoint(self, wpt):
+        if not isinstance(wpt, GPXPoint):
+            dgettext = {'type_expected': GPXPoint.__name__, 'type_got': wpt.__class__.__name__}
+            msg = _("Point type excepted '%(type_expected)s', got '%(type_got)s' instead")
+            raise TypeError(msg % dgettext)
+        return self.appendPoint(wpt.lat, wpt.lon, wpt.ele, timeToSeconds(wpt.time))
+
+
+    def addPoints(self, lwpts):
+        for wpt in lwpts:
+            if not isinstance(wpt, GPXPoint):
+                dgettext = {'type_expected': GPXPoint.__name__, 'type_got': wpt.__class__.__name__}
+                msg = _("Point type excepted '%(type_expected)s', got '%(type_got)s' instead")
+                raise TypeError(msg % dgettext)
+        values = [(timeToSeconds(wpt.time), wpt.lat, wpt.lon, wpt.ele) for wpt in lwpts]
+        return self.addValues(values)
+
+
+    def addValues(self, values):
+        """
+        Adds a list (unsorted) of (seconds, lat, lon, ele) tuples, like
+        'addPoints' but without GPXPoint objects.
+        """
+        self._stats = None
+        self._sindex = None
+        points = zip(self._time, self._lat, self._lon, self._ele)
+        points.extend(values)
+        points.sort(key=lambda point: point[0])
+        self._lat = array.array('d')
+        self._lon = array.array('d')
+        self._ele = array.array('d')
+        self._time = array.array('d')
+        for (seconds, lat, lon, ele) in points:
+            if len(self._time) < 1 or seconds != self._time[-1]:
+                self._lat.append(lat)
+                self._lon.append(lon)
+                self._ele.append(ele)
+                self._time.append(seconds)
+        return len(self._time)
+
+
+    def delPoint(self, pos):
+        if pos >= 0 and pos < len(self._time):
+            del self._lat[pos]
+            del self._lon[pos]
+            del self._ele[pos]
+            del self._time[pos]
+            self._stats = None
+            self._sindex = None
+        else:
+            raise exceptions.GPXErrorSegment(_("Cannot delete point at pos %s!") % pos)
+
+
+    def timeIndex(self):
+        return self._time
+
+
+    def timeMinMax(self):
+        min_date = datetime.datetime.max
+        max_date = datetime.datetime.min
+        if len(self._time) > 0:
+            min_date = _GPX_EPOCH + datetime.timedelta(seconds=self._time[0])
+            max_date = _GPX_EPOCH + datetime.timedelta(seconds=self._time[-1])
+        return (min_date, max_date)
+
 
 
 # #############################
@@ -399,6 +812,8 @@ class GPXTrack(GPXItem):
         self.attr = attr
         self.ltrkseg = []
         self.status = 1
+        self._iindex = None
+        self._sindex = None
 
 
     def __repr__(self):
@@ -418,6 +833,8 @@ class GPXTrack(GPXItem):
             raise TypeError(msg % dgettext)
         if len(trkseg.lwpts) < 1:
             raise exceptions.GPXErrorTrack(_("Segment empty!"))
+        self._iindex = None
+        self._sindex = None
         num_seg = len(self.ltrkseg)
         pos = 0
         if num_seg < 1:
@@ -440,10 +857,24 @@ class GPXTrack(GPXItem):
     def delSegment(self, pos):
         if pos >= 0 and pos < len(self.ltrkseg):
             del self.ltrkseg[pos]
+            self._iindex = None
+            self._sindex = None
         else:
             raise exceptions.GPXErrorTrack(_("Cannot delete segment at pos %s!") % pos)
 
 
+    def changed(self):
+        """
+        Resets the cached indexes of the track and its segments. Call it after
+        changing the points of segments already added to the track: the
+        indexes of the track only check the number of segments or points.
+        """
+        self._iindex = None
+        self._sindex = None
+        for trkseg in self.ltrkseg:
+            trkseg.changed()
+
+
     def position(self, trkseg):
         if not isinstance(trkseg, GPXSegment):
             dgettext = {'type_expected': GPXSegment.__name__, 'type_got': trkseg.__class__.__name__}
@@ -459,7 +890,7 @@ class GPXTrack(GPXItem):
     def listpoints(self):
         list_points = []
         for trkseg in self.ltrkseg:
-            list_points = list_points + trkseg.lwpts
+            list_points.extend(trkseg.lwpts)
         return list_points
 
 
@@ -495,26 +926,81 @@ class GPXTrack(GPXItem):
         return list_points
 
 
+    def intervalIndex(self):
+        """
+        Interval index of the segments: a tuple with the list of start times
+        (sorted, as the segments) and the running maximum of the end times,
+        all of them in seconds from epoch. It is rebuilt when the number of
+        segments changes (see 'changed').
+        """
+        if self._iindex is None or len(self._iindex[0]) != len(self.ltrkseg):
+            starts = []
+            maxends = []
+            maxend = None
+            for trkseg in self.ltrkseg:
+                starts.append(timeToSeconds(trkseg.lwpts[0].time))
+                end = timeToSeconds(trkseg.lwpts[-1].time)
+                if maxend is None or end > maxend:
+                    maxend = end
+                maxends.append(maxend)
+            self._iindex = (starts, maxends)
+        return self._iindex
+
+
     def closest(self, time, tdelta):
         closed_trackseg = []
-        for trkseg in self.ltrkseg :
-            min_time = trkseg.lwpts[0].time - tdelta
-            max_time = trkseg.lwpts[-1].time + tdelta
-            if time > min_time and time < max_time:
+        (starts, maxends) = self.intervalIndex()
+        seconds = timeToSeconds(time)
+        delta = deltaToSeconds(tdelta)
+        # segments starting before time + tdelta, walking back while some
+        # previous segment can still end after time - tdelta
+        pos = bisect.bisect_left(starts, seconds + delta) - 1
+        while pos >= 0 and maxends[pos] > seconds - delta:
+            trkseg = self.ltrkseg[pos]
+            if timeToSeconds(trkseg.lwpts[-1].time) + delta > seconds:
                 closed_trackseg.append(trkseg)
+            pos -= 1
+        closed_trackseg.reverse()
         return closed_trackseg
 
 
+    def pointIndex(self):
+        """
+        Spatial index (GPXPointIndex) of the points of all segments and the
+        position of the first point of each segment in it. It is rebuilt
+        when the number of points changes (see 'changed').
+        """
+        num_points = 0
+        for trkseg in self.ltrkseg:
+            num_points += len(trkseg.lwpts)
+        if self._sindex is None or len(self._sindex[0]) != num_points:
+            lats = []
+            lons = []
+            starts = []
+            for trkseg in self.ltrkseg:
+                starts.append(len(lats))
+                (lat, lon, ele, time) = trkseg.columns()
+                lats.extend(lat)
+                lons.extend(lon)
+            self._sindex = (GPXPointIndex(lats, lons), starts)
+        return self._sindex
+
+
     def nearestSegmentPointDistance(self, lat, lon):
+        """
+        Nearest segment and point to lat, lon and the distance. The query
+        uses the spatial index of the track (built with the first query).
+        """
         min_distance = geomath.MaxDistanceEarth
         seg_nearest = None
         point_nearest = None
-        for trkseg in self.ltrkseg :
-            (point, distance) = trkseg.nearestPointDistance(lat, lon)
-            if distance < min_distance :
-                min_distance = distance
-                seg_nearest = trkseg
-                point_nearest = point
+        (sindex, starts) = self.pointIndex()
+        pos = sindex.nearest(lat, lon)
+        if pos >= 0:
+            seg = bisect.bisect_right(starts, pos) - 1
+            seg_nearest = self.ltrkseg[seg]
+            point_nearest = seg_nearest.lwpts[pos - starts[seg]]
+            min_distance = point_nearest.distance(lat, lon)
         return (seg_nearest, point_nearest, min_distance)
 
 
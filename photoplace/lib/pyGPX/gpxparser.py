@@ -16,7 +16,7 @@
 #   limitations under the License.
 #
 """
-A XML GPX parser based on minidom.
+A streaming XML GPX parser based on ElementTree 'iterparse'.
 """
 __package_name__ = "gpx"
 __package_revision__ = '0'
@@ -27,7 +27,10 @@ __package_license__ = "Apache 2.0"
 __package_copyright__ ="(c) Jose Riguera"
 
 
-import xml.dom.minidom
+try:
+    import xml.etree.cElementTree as ElementTree
+except ImportError:
+    import xml.etree.ElementTree as ElementTree
 import time
 import datetime
 
@@ -60,13 +63,49 @@ import gpxdata
 # GPXParser implementation
 # ########################
 
+# Profiles to parse trackpoints: all the data or only lat/lon/ele/time
+GPXParser_PROFILE_FULL = "full"
+GPXParser_PROFILE_GEOMETRY = "geometry"
+# Only lat/lon/ele/time stored in GPXCompactSegment arrays
+GPXParser_PROFILE_COMPACT = "compact"
+
+_GPXParser_WPT_STRING_TAGS = frozenset([
+    "name", "type", "desc", "cmt", "src", "sym",
+    "fix", "magvar", "geoidheight",
+    "sat", "hdop", "vdop", "pdop", "ageofdgpsdata", "dgpsid",
+])
+
+
+def _tag(node):
+    """
+    Local name of a node, without namespace.
+    """
+    return node.tag.rsplit('}', 1)[-1]
+
+
+def _text(node):
+    """
+    Text (or CDATA) content of a node as unicode, None if it is empty.
+    """
+    if node.text:
+        return unicode(node.text)
+    return None
+
+
+
 class GPXParser:
     """
-    Base class for GPX parser
+    Base class for GPX parser.
+
+    The file is read incrementally: each waypoint, trackpoint, track and
+    route is converted to GPX objects as soon as its XML element is complete,
+    and the element is released after that. Memory depends on the GPX objects
+    created, not on the size of the XML document.
     """
     
     
-    def __init__(self, fd, name, timedelta=datetime.timedelta()):
+    def __init__(self, fd, name, timedelta=datetime.timedelta(),
+        profile=GPXParser_PROFILE_FULL):
         """
         GPXParser class constructor
         
@@ -74,6 +113,10 @@ class GPXParser:
             -`fd`: file description with GPX data.
             -`name`: identification for file descriptor.
             -`timedelta`: timedelta to add to each waypoint time.
+            -`profile`: data parsed from trackpoints, GPXParser_PROFILE_FULL
+            or only coordinates and time with GPXParser_PROFILE_GEOMETRY.
+            GPXParser_PROFILE_COMPACT is like geometry, but segments are
+            GPXCompactSegment (read only points stored in arrays).
         """
         if not isinstance(timedelta, datetime.timedelta):
             dgettext = dict() 
@@ -81,8 +124,18 @@ class GPXParser:
             dgettext['type_got'] = timedelta.__class__.__name__
             msg = _("Time delta type excepted '%(type_expected)s', got '%(type_got)s' instead")
             raise TypeError(msg % dgettext)
+        if profile == GPXParser_PROFILE_GEOMETRY:
+            self._parseTrkpt = self._parseWptGeometry
+        elif profile == GPXParser_PROFILE_FULL:
+            self._parseTrkpt = self._parseWpt
+        elif profile == GPXParser_PROFILE_COMPACT:
+            self._parseTrkpt = self._parseWptCompact
+        else:
+            raise ValueError(_("Unknown parser profile '%s'") % profile)
+        self.profile = profile
         self.timedelta = timedelta
         self.name = name
+        self._tags = {}
         self.gpx = None
         self.fd = fd
         self.parse()
@@ -90,131 +143,102 @@ class GPXParser:
 
     def _parseTime(self, node):
         msg = _("Cannot parse <time> node: ")
-        if node.nodeType == xml.dom.minidom.Node.ELEMENT_NODE:
-            if node.childNodes \
-            and node.firstChild.nodeType == xml.dom.minidom.Node.TEXT_NODE:
-                time = node.firstChild.data
-                try:
-                    yr = int(time[0:4])
-                    mn = int(time[5:7])
-                    da = int(time[8:10])
-                    hr = int(time[11:13])
-                    mi = int(time[14:16])
-                    se = int(time[17:19])
-                    if time[20:]: 
-                        tz = time[20:]
-                    else: 
-                        tz = None
-                    dt = datetime.datetime(yr, mn, da, hr, mi, se, 0, None)
-                    dt = dt + self.timedelta
-                except Exception as e:
-                    msg = msg + "[ %s : %s ]" % (e, node.firstChild.data)
-                    raise exceptions.GPXErrorParse(msg)
-                return dt
-            else:
-                msg = msg + "[!TEXT_NODE]"
-        else:
-            msg = msg + "[!ELEMENT_NODE]"
+        time = _text(node)
+        if time:
+            try:
+                yr = int(time[0:4])
+                mn = int(time[5:7])
+                da = int(time[8:10])
+                hr = int(time[11:13])
+                mi = int(time[14:16])
+                se = int(time[17:19])
+                if time[20:]: 
+                    tz = time[20:]
+                else: 
+                    tz = None
+                dt = datetime.datetime(yr, mn, da, hr, mi, se, 0, None)
+                dt = dt + self.timedelta
+            except Exception as e:
+                msg = msg + "[ %s : %s ]" % (e, time)
+                raise exceptions.GPXErrorParse(msg)
+            return dt
+        msg = msg + "[!TEXT_NODE]"
         raise exceptions.GPXErrorParse(msg)
 
 
     def _parseLink(self, node):
-        if node.nodeType == xml.dom.minidom.Node.ELEMENT_NODE:
-            text = ''
-            ltype = ''
-            lnk = node.getAttribute('href')
-            for lnode in node.childNodes:
-                if lnode.nodeType != xml.dom.minidom.Node.ELEMENT_NODE:
-                    continue
-                if lnode.tagName == "text":
-                    if lnode.firstChild.nodeType == xml.dom.minidom.Node.TEXT_NODE:
-                        text = lnode.firstChild.data
-                elif lnode.tagName == "type":
-                    if lnode.firstChild.nodeType == xml.dom.minidom.Node.TEXT_NODE:
-                        ltype = lnode.firstChild.data
-            return (lnk, text, ltype)
-        return None
+        text = ''
+        ltype = ''
+        lnk = unicode(node.get('href', ''))
+        for lnode in node:
+            tag = _tag(lnode)
+            if tag == "text":
+                if lnode.text:
+                    text = _text(lnode)
+            elif tag == "type":
+                if lnode.text:
+                    ltype = _text(lnode)
+        return (lnk, text, ltype)
 
 
     def _parseAuthor(self, node):
-        if node.nodeType == xml.dom.minidom.Node.ELEMENT_NODE:
-            name = ''
-            email = ''
-            link = ('','','')
-            for anode in node.childNodes:
-                if anode.nodeType != xml.dom.minidom.Node.ELEMENT_NODE:
-                    continue
-                if anode.tagName == "name":
-                    if anode.childNodes:
-                        if anode.firstChild.nodeType == xml.dom.minidom.Node.TEXT_NODE \
-                        or anode.firstChild.nodeType == xml.dom.minidom.Node.CDATA_SECTION_NODE:
-                            name = anode.firstChild.data
-                elif anode.tagName == "email":
-                    emailid = anode.getAttribute('id')
-                    emaildomain = anode.getAttribute('domain')
-                    email = "%s@%s" % (emailid, emaildomain)
-                elif anode.tagName == "link":
-                    link = self._parseLink(anode)
-                    if link == None:
-                        link = ('','','')
-            return (name, email, link)
-        else:
-            return None
+        name = ''
+        email = ''
+        link = ('','','')
+        for anode in node:
+            tag = _tag(anode)
+            if tag == "name":
+                if anode.text:
+                    name = _text(anode)
+            elif tag == "email":
+                emailid = anode.get('id', '')
+                emaildomain = anode.get('domain', '')
+                email = u"%s@%s" % (emailid, emaildomain)
+            elif tag == "link":
+                link = self._parseLink(anode)
+        return (name, email, link)
 
 
     def _parseCopyright(self, node):
-        if node.nodeType == xml.dom.minidom.Node.ELEMENT_NODE:
-            year = ''
-            license = ''
-            author =  node.getAttribute('author')
-            for cnode in node.childNodes:
-                if cnode.nodeType != xml.dom.minidom.Node.ELEMENT_NODE:
-                    continue
-                if cnode.tagName == "year":
-                    if cnode.childNodes \
-                    and cnode.firstChild.nodeType == xml.dom.minidom.Node.TEXT_NODE:
-                            year = cnode.firstChild.data
-                elif cnode.tagName == "license":
-                    if cnode.childNodes:
-                        if cnode.firstChild.nodeType == xml.dom.minidom.Node.TEXT_NODE \
-                        or cnode.firstChild.nodeType == xml.dom.minidom.Node.CDATA_SECTION_NODE:
-                            license = cnode.firstChild.data
-            return (author, year, license)
-        return None
+        year = ''
+        license = ''
+        author = unicode(node.get('author', ''))
+        for cnode in node:
+            tag = _tag(cnode)
+            if tag == "year":
+                if cnode.text:
+                    year = _text(cnode)
+            elif tag == "license":
+                if cnode.text:
+                    license = _text(cnode)
+        return (author, year, license)
 
 
     def _parseWpt(self, wpt):
         msg = _("Cannot parse <wpt> node: ")
-        if wpt.nodeType != xml.dom.minidom.Node.ELEMENT_NODE:
-            msg = msg + "[!ELEMENT_NODE]"
-            raise exceptions.GPXErrorParse(msg)
         ele = 0.0
         attr = {}
         lat = 0.0
         lon = 0.0
-        string_tags = ["name", "type", "desc", "cmt", "src", "sym"]
-        string_tags += ["fix", "magvar", "geoidheight" ]
-        string_tags += ["sat", "hdop", "vdop", "pdop", "ageofdgpsdata", "dgpsid" ]
-        dt = datetime.datetime.utcnow()
+        string_tags = _GPXParser_WPT_STRING_TAGS
+        dt = None
         try:
-            lat = float(wpt.getAttribute('lat'))
-            lon = float(wpt.getAttribute('lon'))
-        except ValueError as valerror:
+            lat = float(wpt.get('lat'))
+            lon = float(wpt.get('lon'))
+        except (TypeError, ValueError) as valerror:
             msg = msg + "<lat='%s' lon='%s'> [%s]" % (lat, lon, valerror)
             raise exceptions.GPXErrorParse(msg)
         try:
-            for node in wpt.childNodes:
-                if node.nodeType != xml.dom.minidom.Node.ELEMENT_NODE: 
-                    continue
-                if node.tagName == "ele": 
+            for node in wpt:
+                tag = _tag(node)
+                if tag == "ele": 
                     try:
-                        if node.firstChild.nodeType == xml.dom.minidom.Node.TEXT_NODE:
-                            ele = float(node.firstChild.data)
+                        ele = float(node.text)
                     except:
                         pass
-                elif node.tagName == "time":
+                elif tag == "time":
                     dt = self._parseTime(node)
-                elif node.tagName == "link":
+                elif tag == "link":
                     if not 'link' in attr: 
                         attr['link'] = []
                     try:
@@ -222,162 +246,239 @@ class GPXParser:
                     except:
                         pass
                 else:
-                    if node.childNodes and node.tagName in string_tags:
-                        if node.firstChild.nodeType == xml.dom.minidom.Node.TEXT_NODE \
-                        or node.firstChild.nodeType == xml.dom.minidom.Node.CDATA_SECTION_NODE:
-                            attr[node.tagName] = node.firstChild.data
+                    if node.text and tag in string_tags:
+                        attr[unicode(tag)] = _text(node)
         except exceptions.GPXErrorParse as gpxerror:
             msg = msg + "<lat='%s' lon='%s'> %s" % (lat, lon, gpxerror)
             raise exceptions.GPXErrorParse(msg)
         except Exception as exception:
             msg = msg + str(exception)
             raise exceptions.GPXErrorParse(msg)
+        if dt is None:
+            dt = datetime.datetime.utcnow()
         wpt = gpxdata.GPXPoint(lat, lon, ele, dt, attr)
         return wpt
 
 
-    def _parseMetadata(self, gpx, meta={}):
-        output = meta
-        for metadata in gpx.getElementsByTagName('metadata'):
-            for node in metadata.childNodes:
-                if node.nodeType != xml.dom.minidom.Node.ELEMENT_NODE:
-                    continue
-                if node.tagName == "name" or \
-                    node.tagName == "desc" or \
-                    node.tagName == 'keywords':
-                    if node.childNodes \
-                    and (node.firstChild.nodeType == xml.dom.minidom.Node.TEXT_NODE \
-                    or node.firstChild.nodeType == xml.dom.minidom.Node.CDATA_SECTION_NODE):
-                        output[node.tagName] = node.firstChild.data
-                    else:
-                        output[node.tagName] = ""
-                elif node.tagName == "time":
+    def _parseWptGeometry(self, wpt):
+        # Fast path for trackpoints: only lat, lon, ele and time.
+        (lat, lon, ele, dt) = self._parseWptValues(wpt)
+        return gpxdata.GPXPoint(lat, lon, ele, dt)
+
+
+    def _parseWptCompact(self, wpt):
+        # Values for GPXCompactSegment, no GPXPoint is created.
+        (lat, lon, ele, dt) = self._parseWptValues(wpt)
+        return (gpxdata.timeToSeconds(dt), lat, lon, ele)
+
+
+    def _parseWptValues(self, wpt):
+        try:
+            lat = float(wpt.get('lat'))
+            lon = float(wpt.get('lon'))
+        except (TypeError, ValueError) as valerror:
+            msg = _("Cannot parse <wpt> node: ")
+            msg = msg + "<lat='%s' lon='%s'> [%s]" % (wpt.get('lat'), wpt.get('lon'), valerror)
+            raise exceptions.GPXErrorParse(msg)
+        ele = 0.0
+        dt = None
+        tag_ele = self._tags['ele']
+        tag_time = self._tags['time']
+        for node in wpt:
+            tag = node.tag
+            if tag == tag_ele:
+                try:
+                    ele = float(node.text)
+                except:
+                    pass
+            elif tag == tag_time:
+                try:
                     dt = self._parseTime(node)
-                    output['time'] = dt
-                elif node.tagName == "bounds":
-                    minlat = node.getAttribute("minlat")
-                    maxlat = node.getAttribute("maxlat")
-                    minlon = node.getAttribute("minlon")
-                    maxlon = node.getAttribute("maxlon")
-                    output['bounds'] = (minlat, maxlat, minlon, maxlon)
-                elif node.tagName == "link":
-                    try:
-                        if not 'link' in output: 
-                            output['link'] = []
-                        output['link'].append(self._parseLink(node))
-                    except:
-                        pass
-                elif node.tagName == "author":
-                    try:
-                        output['author'] = self._parseAuthor(node)
-                    except:
-                        pass
-                elif node.tagName == "copyright":
-                    try:
-                        output['copyright'] = self._parseCopyright(node)
-                    except:
-                        pass
+                except exceptions.GPXErrorParse as gpxerror:
+                    msg = _("Cannot parse <wpt> node: ")
+                    msg = msg + "<lat='%s' lon='%s'> %s" % (lat, lon, gpxerror)
+                    raise exceptions.GPXErrorParse(msg)
+        if dt is None:
+            dt = datetime.datetime.utcnow()
+        return (lat, lon, ele, dt)
+
+
+    def _parseMetadata(self, metadata, meta={}):
+        output = meta
+        for node in metadata:
+            tag = _tag(node)
+            if tag == "name" or \
+                tag == "desc" or \
+                tag == 'keywords':
+                if node.text:
+                    output[unicode(tag)] = _text(node)
+                else:
+                    output[unicode(tag)] = ""
+            elif tag == "time":
+                dt = self._parseTime(node)
+                output['time'] = dt
+            elif tag == "bounds":
+                minlat = unicode(node.get("minlat", ''))
+                maxlat = unicode(node.get("maxlat", ''))
+                minlon = unicode(node.get("minlon", ''))
+                maxlon = unicode(node.get("maxlon", ''))
+                output['bounds'] = (minlat, maxlat, minlon, maxlon)
+            elif tag == "link":
+                try:
+                    if not 'link' in output: 
+                        output['link'] = []
+                    output['link'].append(self._parseLink(node))
+                except:
+                    pass
+            elif tag == "author":
+                try:
+                    output['author'] = self._parseAuthor(node)
+                except:
+                    pass
+            elif tag == "copyright":
+                try:
+                    output['copyright'] = self._parseCopyright(node)
+                except:
+                    pass
         return output
 
 
+    def _parseAttr(self, node, attr, string_tags):
+        tag = _tag(node)
+        if tag == "link":
+            if not 'link' in attr: 
+                attr['link'] = []
+            attr["link"].append(self._parseLink(node))
+        else:
+            if node.text and tag in string_tags:
+                attr[unicode(tag)] = _text(node)
+
+
+    def _parseTrk(self, trk, traknumber, segments):
+        attr = {}
+        string_tags = ["name", "desc", "type", "src", "cmt", "number"]
+        for node in trk:
+            if _tag(node) != "trkseg":
+                self._parseAttr(node, attr, string_tags)
+        attr.setdefault('number', traknumber)
+        if not 'name' in attr.keys(): 
+            dgettext = {'track_number': traknumber, 'number': attr["number"]}
+            attr["name"] = _("Track number %(track_number)s (%(number)s)") % (dgettext)
+        if not 'desc' in attr.keys(): 
+            attr.setdefault('type', '')
+            attr.setdefault('src', '')
+            attr.setdefault('link', '')
+            attr["desc"] =  _("Track %(number)s %(type)s. %(src)s. %(link)s.") % (attr)
+        gpxtrk = gpxdata.GPXTrack(attr["name"], attr["desc"], attr)
+        for gpxtrkseg in segments:
+            gpxtrk.addSegment(gpxtrkseg)
+        return gpxtrk
+
+
+    def _parseRte(self, rte, routenumber):
+        # Route. Non time ordered waypoints
+        attr = dict()
+        pointlist = []
+        string_tags = ["name", "desc", "type", "src", "cmt", "number"]
+        for node in rte:
+            if _tag(node) == "rtept":
+                point = self._parseWpt(node)
+                pointlist.append(point)
+            else:
+                self._parseAttr(node, attr, string_tags)
+        attr.setdefault('number', routenumber)
+        if not 'name' in attr.keys(): 
+            dgettext = {'route_number': routenumber, 'number': attr["number"]}
+            attr["name"] = _("Route number %(route_number)s (of %(number)s)") % (dgettext)
+        if not 'desc' in attr.keys(): 
+            attr.setdefault('type', '')
+            attr.setdefault('src', '')
+            attr.setdefault('link', '')
+            attr["desc"] = _("Route %(number)s %(type)s. %(src)s. %(link)s.") % (attr)
+        return gpxdata.GPXSegment(attr["name"], attr, pointlist)
+
+
     def parse(self, parsemetadata=True, append=False):
+        metadata = dict()
+        waypoints = []
+        tracks = []
+        routes = []
+        traknumber = 0
+        routenumber = 0
+        segments = []
+        points = []
+        # stack of open elements, parents of the current one
+        stack = []
+        # local names of the tags already seen
+        names = dict()
         try:
-            dom = xml.dom.minidom.parse(self.fd)
-            dom.normalize()
+            for event, node in ElementTree.iterparse(self.fd, ("start", "end")):
+                if event == "start":
+                    if not stack:
+                        # full names (with namespace) for the fast path
+                        namespace = node.tag[:len(node.tag) - len(_tag(node))]
+                        self._tags['ele'] = namespace + "ele"
+                        self._tags['time'] = namespace + "time"
+                    stack.append(node)
+                    continue
+                stack.pop()
+                depth = len(stack)
+                try:
+                    tag = names[node.tag]
+                except KeyError:
+                    tag = _tag(node)
+                    names[node.tag] = tag
+                if depth == 3 and tag == "trkpt":
+                    points.append(self._parseTrkpt(node))
+                elif depth == 2 and tag == "trkseg" and _tag(stack[1]) == "trk":
+                    if self.profile == GPXParser_PROFILE_COMPACT:
+                        gpxtrkseg = gpxdata.GPXCompactSegment(str(len(segments) + 1))
+                        gpxtrkseg.addValues(points)
+                    else:
+                        gpxtrkseg = gpxdata.GPXSegment.fromPoints(str(len(segments) + 1), points)
+                    segments.append(gpxtrkseg)
+                    points = []
+                elif depth == 1 and tag == "trk":
+                    traknumber += 1
+                    tracks.append(self._parseTrk(node, traknumber, segments))
+                    segments = []
+                elif depth == 1 and tag == "wpt":
+                    waypoints.append(self._parseWpt(node))
+                elif depth == 1 and tag == "rte":
+                    routenumber += 1
+                    routes.append(self._parseRte(node, routenumber))
+                elif depth == 1 and tag == "metadata":
+                    if parsemetadata:
+                        metadata = self._parseMetadata(node, metadata)
+                elif depth == 1:
+                    # not a track, its segments are discarded
+                    segments = []
+                else:
+                    if depth == 2:
+                        # trackpoints only belong to <trk><trkseg>
+                        points = []
+                    # children needed by their parents
+                    continue
+                # release processed elements
+                node.clear()
+                if stack:
+                    stack[-1].remove(node)
+        except exceptions.GPXError:
+            raise
         except Exception as e:
             raise exceptions.GPXErrorParse(str(e))
-        attr = dict()
-        metadata = dict()
-        gpxdom = dom.documentElement
-        if gpxdom.hasAttributes():
-            for attribute in gpxdom.attributes.keys():
-                attr[attribute] = gpxdom.getAttribute(attribute)
+        name = metadata.setdefault('name', self.name)
+        time = metadata.setdefault('time', datetime.datetime.utcnow())
         if parsemetadata:
-            metadata = self._parseMetadata(gpxdom)
-            name = metadata.setdefault('name', self.name)
-            time = metadata.setdefault('time', datetime.datetime.utcnow())
             metadata.setdefault('desc', '')
             metadata.setdefault('author', '')
             metadata.setdefault('copyright', '')
         if not append or not self.gpx:
             # create a GPX object
             self.gpx = gpxdata.GPX(name, time, metadata)
-        # Waypoints
-        for waypoint in gpxdom.getElementsByTagName('wpt'):
-            wpt = self._parseWpt(waypoint)
-            self.gpx.waypoints.append(wpt)
-        # Tracks
-        traknumber = 0
-        string_tags = ["name", "desc", "type", "src", "cmt", "number"]
-        for trk in gpxdom.getElementsByTagName("trk"):
-            attr = {}
-            traknumber += 1
-            for node in trk.childNodes:
-                if node.nodeType != node.ELEMENT_NODE:
-                    continue
-                if node.tagName == "link":
-                    if not 'link' in attr: 
-                        attr['link'] = []
-                    attr["link"].append(self._parseLink(node))
-                else:
-                    if node.childNodes and node.tagName in string_tags:
-                        if node.firstChild.nodeType == xml.dom.minidom.Node.TEXT_NODE \
-                        or node.firstChild.nodeType == xml.dom.minidom.Node.CDATA_SECTION_NODE:
-                            attr[node.tagName] = node.firstChild.data
-            attr.setdefault('number', traknumber)
-            if not 'name' in attr.keys(): 
-                dgettext = {'track_number': traknumber, 'number': attr["number"]}
-                attr["name"] = _("Track number %(track_number)s (%(number)s)") % (dgettext)
-            if not 'desc' in attr.keys(): 
-                attr.setdefault('type', '')
-                attr.setdefault('src', '')
-                attr.setdefault('link', '')
-                attr["desc"] =  _("Track %(number)s %(type)s. %(src)s. %(link)s.") % (attr)
-            gpxtrk = gpxdata.GPXTrack(attr["name"], attr["desc"], attr)
-            # TrackSegs
-            trksegcounter = 0
-            for trkseg in trk.getElementsByTagName("trkseg"):
-                trksegcounter = trksegcounter + 1
-                gpxtrkseg = gpxdata.GPXSegment(str(trksegcounter))
-                trkpts = trkseg.getElementsByTagName("trkpt")
-                for trkpt in trkpts:
-                    point = self._parseWpt(trkpt)
-                    gpxtrkseg.addPoint(point)
-                gpxtrk.addSegment(gpxtrkseg)
-            self.gpx.tracks.append(gpxtrk)
-        # Route. Non time ordered waypoints
-        routenumber = 0
-        string_tags = ["name", "desc", "type", "src", "cmt", "number"]
-        for rte in gpxdom.getElementsByTagName("rte"):
-            attr = dict()
-            routenumber += 1
-            pointlist = []
-            for node in rte.childNodes:
-                if node.nodeType != node.ELEMENT_NODE:
-                    continue
-                if node.tagName == "rtept":
-                    point = self._parseWpt(node)
-                    pointlist.append(point)
-                elif node.tagName == "link":
-                    if not 'link' in attr: 
-                        attr['link'] = []
-                    attr["link"].append(self._parseLink(node))
-                else:
-                    if node.childNodes and node.tagName in string_tags:
-                        if node.firstChild.nodeType == xml.dom.minidom.Node.TEXT_NODE \
-                        or node.firstChild.nodeType == xml.dom.minidom.Node.CDATA_SECTION_NODE:
-                            attr[node.tagName] = node.firstChild.data
-            attr.setdefault('number', routenumber)
-            if not 'name' in attr.keys(): 
-                dgettext = {'route_number': routenumber, 'number': attr["number"]}
-                attr["name"] = _("Route number %(route_number)s (of %(number)s)") % (dgettext)
-            if not 'desc' in attr.keys(): 
-                attr.setdefault('type', '')
-                attr.setdefault('src', '')
-                attr.setdefault('link', '')
-                attr["desc"] = _("Route %(number)s %(type)s. %(src)s. %(link)s.") % (attr)
-            gpxrte = gpxdata.GPXSegment(attr["name"], attr, pointlist)
-            self.gpx.routes.append(gpxrte)
+        self.gpx.waypoints += waypoints
+        self.gpx.tracks += tracks
+        self.gpx.routes += routes
 
 
 # EOF
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#   Copyright 2010-2015 Jose Riguera Lopez <jriguera@gmail.com>
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+import sys
+import os
+import os.path
+import time
+import datetime
+import tempfile
+import random
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+import pyGPX
+
+
+# ####################
+# Benchmark Code !!!!!
+# ####################
+
+def gengpx(f, num_points):
+    start = datetime.datetime(2014, 12, 1, 8, 0, 0)
+    fd = open(f, 'w')
+    fd.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    fd.write('<gpx xmlns="http://www.topografix.com/GPX/1/1" version="1.1" creator="benchmark">\n')
+    fd.write('<trk>\n<name>Benchmark</name>\n<trkseg>\n')
+    for i in xrange(num_points):
+        t = start + datetime.timedelta(seconds=i)
+        fd.write('<trkpt lat="%.8f" lon="%.8f">\n' % (42.0 + i * 1e-6, -8.0 + i * 1e-6))
+        fd.write('<ele>%.3f</ele>\n' % (100.0 + (i % 100)))
+        fd.write('<time>%s</time>\n' % t.strftime("%Y-%m-%dT%H:%M:%SZ"))
+        fd.write('<hdop>1.2</hdop>\n<sat>7</sat>\n</trkpt>\n')
+    fd.write('</trkseg>\n</trk>\n</gpx>\n')
+    fd.close()
+
+
+def parse(f, profile):
+    fd = open(f)
+    t0 = time.time()
+    gpxparser = pyGPX.GPXParser(fd, f, datetime.timedelta(), profile)
+    elapsed = time.time() - t0
+    fd.close()
+    num_points = 0
+    for track in gpxparser.gpx.tracks:
+        for trkseg in track.ltrkseg:
+            num_points += len(trkseg.lwpts)
+    return (num_points, elapsed)
+
+
+def benchmark(num_points):
+    print "\n* GPXParser benchmark (%d trackpoints)\n" % num_points
+    (fd, f) = tempfile.mkstemp(".gpx")
+    os.close(fd)
+    try:
+        gengpx(f, num_points)
+        for profile in [pyGPX.GPXParser_PROFILE_FULL, pyGPX.GPXParser_PROFILE_GEOMETRY,
+            pyGPX.GPXParser_PROFILE_COMPACT]:
+            (points, elapsed) = parse(f, profile)
+            print "Profile %-8s: %d points in %.2f s, %.0f points/s" % \
+                (profile, points, elapsed, points / elapsed)
+    finally:
+        os.unlink(f)
+    print "\n* End Benchmark!\n"
+
+
+def genpath(num_points):
+    random.seed(num_points)
+    start = datetime.datetime(2014, 12, 1, 8, 0, 0)
+    lat = 42.0
+    lon = -8.0
+    points = []
+    for i in xrange(num_points):
+        lat += random.uniform(-1e-4, 1.2e-4)
+        lon += random.uniform(-1e-4, 1.2e-4)
+        t = start + datetime.timedelta(seconds=i)
+        points.append(pyGPX.GPXPoint(lat, lon, 0.0, t))
+    return points
+
+
+def benchmark_simpl(num_points, epsilon=10.0):
+    print "\n* simplDouglasPeucker benchmark (%d points, %.1f m)\n" % (num_points, epsilon)
+    points = genpath(num_points)
+    numpy = pyGPX.geomath.numpy
+    results = []
+    for mode in ["python", "numpy"]:
+        if mode == "python":
+            pyGPX.geomath.numpy = None
+        elif numpy == None:
+            print "Mode %-6s: NumPy not available" % mode
+            continue
+        else:
+            pyGPX.geomath.numpy = numpy
+        t0 = time.time()
+        simpl = pyGPX.simplDouglasPeucker(points, epsilon)
+        elapsed = time.time() - t0
+        results.append(simpl)
+        print "Mode %-6s: %d -> %d points in %.2f s" % (mode, num_points, len(simpl), elapsed)
+    pyGPX.geomath.numpy = numpy
+    if len(results) > 1:
+        same = len(results[0]) == len(results[1]) and \
+            all(p0 is p1 for (p0, p1) in zip(results[0], results[1]))
+        print "Same points: %s" % same
+    print "\n* End Benchmark!\n"
+
+
+def nearest(track, lat, lon):
+    # Previous implementation, a scan of all the points
+    min_distance = pyGPX.geomath.MaxDistanceEarth
+    seg_nearest = None
+    point_nearest = None
+    for trkseg in track.ltrkseg:
+        for point in trkseg.lwpts:
+            distance = point.distance(lat, lon)
+            if distance < min_distance:
+                min_distance = distance
+                seg_nearest = trkseg
+                point_nearest = point
+    return (seg_nearest, point_nearest, min_distance)
+
+
+def benchmark_nearest(num_points, num_queries=100):
+    print "\n* nearestSegmentPointDistance benchmark (%d points, %d queries)\n" % \
+        (num_points, num_queries)
+    points = genpath(num_points)
+    track = pyGPX.GPXTrack("Benchmark")
+    half = num_points // 2
+    track.addSegment(pyGPX.GPXSegment.fromPoints("seg1", points[:half]))
+    track.addSegment(pyGPX.GPXSegment.fromPoints("seg2", points[half:]))
+    # positions around the path, like photos taken near the track
+    random.seed(num_queries)
+    queries = []
+    for i in xrange(num_queries):
+        point = random.choice(points)
+        queries.append((point.lat + random.uniform(-1e-3, 1e-3),
+            point.lon + random.uniform(-1e-3, 1e-3)))
+    t0 = time.time()
+    old = [nearest(track, lat, lon) for (lat, lon) in queries]
+    elapsed = time.time() - t0
+    print "Scan : %d queries in %.2f s" % (num_queries, elapsed)
+    t0 = time.time()
+    track.pointIndex()
+    elapsed = time.time() - t0
+    print "Index: built in %.2f s" % elapsed
+    t0 = time.time()
+    new = [track.nearestSegmentPointDistance(lat, lon) for (lat, lon) in queries]
+    elapsed = time.time() - t0
+    print "Index: %d queries in %.4f s" % (num_queries, elapsed)
+    same = all(o[0] is n[0] and o[1] is n[1] for (o, n) in zip(old, new))
+    print "Same points: %s" % same
+    print "\n* End Benchmark!\n"
+
+
+if __name__ == "__main__":
+    num_points = 1000000
+    if len(sys.argv) > 1:
+        num_points = int(sys.argv[1])
+    benchmark(num_points)
+    benchmark_simpl(100000)
+    benchmark_nearest(100000)
+
+#EOF
@@ -43,8 +43,9 @@ __package_license__ = __license__
 __package_copyright__ = __copyright__
 
 
-__all__ = ["sxmltemplate", "exceptions"]
+__all__ = ["sxmltemplate", "sxmlstring", "exceptions"]
 from sxmltemplate import *
+from sxmlstring import *
 from exceptions import *
 
 
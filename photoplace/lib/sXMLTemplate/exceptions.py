@@ -84,4 +84,12 @@ class SXMLTemplateErrorRedo(SXMLTemplateError):
     def __init__(self, msg):
         self.value = _("Cannot set element '%s' in template.") % (msg)
 
+
+class SXMLTemplateErrorCompile(SXMLTemplateError):
+    """
+    Exceptions compiling a XML node as a string template ...
+    """
+    def __init__(self, msg):
+        self.value = _("Cannot compile XML node as string template: %s.") % (msg)
+
 # EOF
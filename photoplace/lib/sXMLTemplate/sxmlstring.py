@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright © 2008 Jose Riguera Lopez <jriguera@gmail.com>
+#
+"""
+String backend for SXMLTemplate module.
+
+A repeatable node of a template is compiled once into literal strings and
+gaps, and it is rendered without DOM, with the same output (byte by byte)
+than filling a copy of the node and writing it with "writexml".
+"""
+__author__ = "Jose Riguera Lopez <jriguera@gmail.com>"
+__version__ = "0.4.0"
+__date__ = "December 2010"
+__license__ = "GPL (v3 or later)"
+__copyright__ ="(c) Jose Riguera"
+
+
+import xml.dom
+import xml.dom.minidom
+import StringIO
+
+import exceptions
+
+
+# #################################
+# SXMLStringTemplate implementation
+# #################################
+
+# Kinds of compiled nodes
+_STATIC = 0
+_ELEMENT = 1
+_TEXT = 2
+_CDATA = 3
+_COMMENT = 4
+
+
+def _escape(data):
+    # Like xml.dom.minidom._write_data
+    return data.replace("&", "&amp;").replace("<", "&lt;"). \
+        replace("\"", "&quot;").replace(">", "&gt;")
+
+
+class SXMLStringTemplate(object):
+    """
+    Compiled string template of a XML node
+
+    The node is compiled for the indentation arguments of "writexml" (with
+    "indent", "addindent" and "newl" as empty strings, the output is like
+    "toxml"). Parts without "%" are serialized when it is compiled, only
+    the gaps are filled, with the same rules of "SXMLTemplate": keys with
+    "deletetag" value remove attributes and elements.
+    """
+    def __init__(self, node, indent=u"", addindent=u"", newl=u""):
+        """
+        SXMLStringTemplate class constructor
+
+        :Parameters:
+            -`node`: XML node (element) to compile.
+            -`indent`: current indentation of the node.
+            -`addindent`: indentation to add to children.
+            -`newl`: newline string.
+        """
+        object.__init__(self)
+        self.addindent = addindent
+        self.newl = newl
+        if node.nodeType != xml.dom.minidom.Node.ELEMENT_NODE:
+            raise exceptions.SXMLTemplateErrorCompile(node.nodeName)
+        self.root = self._compile(node, indent, True)
+
+
+    def _static(self, node, indent):
+        """
+        It returns the string of the node if there is nothing to fill in it.
+        """
+        if node.nodeType == xml.dom.minidom.Node.ELEMENT_NODE:
+            if node.hasAttributes():
+                for attribute in node.attributes.keys():
+                    if '%' in node.getAttribute(attribute):
+                        return None
+            for child in node.childNodes:
+                if self._static(child, indent) == None:
+                    return None
+            writer = StringIO.StringIO()
+            node.writexml(writer, indent, self.addindent, self.newl)
+            return writer.getvalue()
+        return None
+
+
+    def _compile(self, node, indent, root=False):
+        nodetype = node.nodeType
+        if nodetype == xml.dom.minidom.Node.ELEMENT_NODE:
+            if not root:
+                static = self._static(node, indent)
+                if static != None:
+                    return (_STATIC, static)
+            attributes = []
+            if node.hasAttributes():
+                names = node.attributes.keys()
+                names.sort()
+                for name in names:
+                    value = node.getAttribute(name)
+                    attributes.append((u" %s=\"" % name, value, '%' in value))
+            children = []
+            for child in node.childNodes:
+                children.append(self._compile(child, indent + self.addindent))
+            head = indent + u"<" + node.tagName
+            tail = u"</%s>%s" % (node.tagName, self.newl)
+            return (_ELEMENT, head, attributes, children, indent, tail)
+        elif nodetype == xml.dom.minidom.Node.TEXT_NODE:
+            return (_TEXT, node.data, '%' in node.data, indent)
+        elif nodetype == xml.dom.minidom.Node.CDATA_SECTION_NODE:
+            return (_CDATA, node.data, '%' in node.data, indent)
+        elif nodetype == xml.dom.minidom.Node.COMMENT_NODE:
+            return (_COMMENT, node.data, '%' in node.data, indent)
+        raise exceptions.SXMLTemplateErrorCompile(node.nodeName)
+
+
+    def _fill(self, data, dictionary):
+        # Like a text node in SXMLTemplate._fillNodeTemplate
+        try:
+            return False, data % dictionary
+        except UserWarning:
+            return True, data
+        except:
+            return False, data
+
+
+    def _children(self, compiled, dictionary):
+        """
+        It fills the children of an element. Returns the number of times
+        the element has been marked to be deleted (see "_fillNodeTemplate"
+        of "SXMLTemplate") and the list of children which are not deleted,
+        (kind, string) for elements and (kind, data, indent) for the rest.
+        """
+        delete = 0
+        children = []
+        for child in compiled[3]:
+            kind = child[0]
+            if kind == _STATIC:
+                children.append((_STATIC, child[1]))
+            elif kind == _ELEMENT:
+                out = []
+                deleted = self._element(child, dictionary, out)
+                if deleted:
+                    if deleted > 1:
+                        # The DOM version tries to remove it twice
+                        raise xml.dom.NotFoundErr()
+                    delete = 0
+                else:
+                    children.append((_ELEMENT, out))
+            else:
+                data = child[1]
+                if child[2]:
+                    deleted, data = self._fill(data, dictionary)
+                    if deleted:
+                        delete += 1
+                children.append((kind, data, child[3]))
+        return delete, children
+
+
+    def _element(self, compiled, dictionary, out):
+        """
+        It fills and writes the element to the list `out`, if it is not
+        deleted. Returns the number of times it was marked to be deleted.
+        """
+        (kind, head, attributes, nodes, indent, tail) = compiled
+        parts = [head]
+        for name, value, fill in attributes:
+            if fill:
+                try:
+                    value = value % dictionary
+                except UserWarning:
+                    continue
+            parts.append(name)
+            if value:
+                parts.append(_escape(value))
+            parts.append(u"\"")
+        delete, children = self._children(compiled, dictionary)
+        if delete:
+            return delete
+        out.extend(parts)
+        if not children:
+            out.append(u"/>" + self.newl)
+        elif len(children) == 1 and children[0][0] == _TEXT:
+            out.append(u">")
+            if children[0][1]:
+                out.append(_escape(children[0][1]))
+            out.append(tail)
+        else:
+            out.append(u">" + self.newl)
+            self._write(children, out)
+            out.append(indent)
+            out.append(tail)
+        return 0
+
+
+    def _write(self, children, out):
+        for child in children:
+            kind = child[0]
+            if kind == _STATIC:
+                out.append(child[1])
+            elif kind == _ELEMENT:
+                out.extend(child[1])
+            elif kind == _TEXT:
+                data = u"%s%s%s" % (child[2], child[1], self.newl)
+                if data:
+                    out.append(_escape(data))
+            elif kind == _CDATA:
+                if child[1].find("]]>") >= 0:
+                    raise ValueError("']]>' not allowed in a CDATA section")
+                out.append(u"<![CDATA[%s]]>" % child[1])
+            else:
+                if "--" in child[1]:
+                    raise ValueError("'--' is not allowed in a comment node")
+                out.append(u"%s<!--%s-->%s" % (child[2], child[1], self.newl))
+
+
+    def render(self, dictionary):
+        """
+        It returns the list of strings of the node filled with data, or None
+        if the node is deleted.
+
+        :Parameters:
+            -`dictionary`: "SXMLTemplate.TemplateDict" with data.
+        """
+        out = []
+        if self._element(self.root, dictionary, out):
+            return None
+        return out
+
+
+    def renderChildren(self, dictionary):
+        """
+        It returns the list of strings of the children of the node filled
+        with data. The node is never deleted.
+
+        :Parameters:
+            -`dictionary`: "SXMLTemplate.TemplateDict" with data.
+        """
+        delete, children = self._children(self.root, dictionary)
+        out = []
+        self._write(children, out)
+        return out
+
+
+# EOF
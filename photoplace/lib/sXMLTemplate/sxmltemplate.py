@@ -31,6 +31,7 @@ import string
 import os.path
 import gettext
 import locale
+import StringIO
 
 __GETTEXT_DOMAIN__ = "sxmltemplate"
 __PACKAGE_DIR__ = os.path.abspath(os.path.dirname(__file__))
@@ -48,6 +49,7 @@ except Exception as e:
     _ = lambda s: unicode(s)
 
 import exceptions
+import sxmlstring
 
 
 # ###################################
@@ -89,13 +91,26 @@ class SXMLTemplate:
         "key<separator>defaultvalue" indicates that if "key" is not found, then "defaultvalue" 
         will be returned. It is like an OR: returns value or "defaultvalue". 
         It is possible to define a global default value for all keys.
+        Values of keys not found can be got with a function ("missing"), only 
+        when they are used. It returns the value or raises KeyError, and then
+        it is not called again for that key.
         """
+        def __init__(self, data={}, missing=None):
+            dict.__init__(self, data)
+            self.missing = missing
+            self.misses = set()
+
         def __getitem__(self, key):
             try:
                 k, default = key.split(SXMLTemplate.separatorKey, 1)
             except ValueError:
                 k = key.split(SXMLTemplate.separatorKey, 1)[0]
                 default = SXMLTemplate.defaultValue
+            if self.missing != None and not k in self and not k in self.misses:
+                try:
+                    self[k] = self.missing(k)
+                except KeyError:
+                    self.misses.add(k)
             random = SXMLTemplate.magic
             value = self.get(k, default + random)
             if value == SXMLTemplate.deletetag + random:
@@ -115,7 +130,10 @@ class SXMLTemplate:
         self.parents = []
         self.templatecounter = 0
         self.templates = []
+        self.plans = []
         self.templatedom = None
+        self.templateplan = None
+        self.stringtemplates = {}
         self.rawtemplate = None
         self.redoelements = redoelements
         # Open stream (file, string ...) and read it
@@ -159,6 +177,8 @@ class SXMLTemplate:
         self.parents = []
         self.templatecounter = 0
         self.templates = []
+        self.plans = []
+        self.stringtemplates = {}
         self.redoelements = redoelements
         for element in redoelements:
             # split nodes to repeat
@@ -182,6 +202,7 @@ class SXMLTemplate:
                     parent = node.parentNode
                     self.parents.append(parent)
                     self.templates.append(parent.removeChild(node))
+                    self.plans.append(self._planNodeTemplate(node))
                     self.templatecounter = self.templatecounter + 1
                     break
             if oldcounter == self.templatecounter:
@@ -195,7 +216,7 @@ class SXMLTemplate:
         :Parameters:
             -`data`: dictionary with data for base nodes of template.
         """
-        dictionary = self.TemplateDict(data)
+        dictionary = self._dictionary(data)
         delete, lnodes = self._fillNodeTemplate(self.dom.documentElement, dictionary)
 
 
@@ -205,20 +226,150 @@ class SXMLTemplate:
         This function clones the "repeatable" nodes from template and fills it with data
         from the dictionary.
 
+        :Parameters:
+            -`data`: dictionary with data for new XML nodes.
+            -`lwhere`: list of nodes which will be filled with data.
+        """
+        for parent, newnode in self.renderData(data, lwhere):
+            parent.appendChild(newnode)
+
+
+    def renderData(self, data, lwhere=[]):
+        """
+        Like "setData", but the new nodes are not appended to the XML. It returns a
+        list of tuples (parent node, new node) to do something else with them.
+
         :Parameters:
             -`data`: dictionary with data for new XML nodes.
             -`lwhere`: list of nodes which will be filled with data.
         """
         if not lwhere:
             lwhere = list(self.templates)
-        dictionary = self.TemplateDict(data)
+        dictionary = self._dictionary(data)
+        newnodes = []
         for counter in xrange(0, self.templatecounter):
             if self.templates[counter] not in lwhere:
                 continue
             newnode = self.templates[counter].cloneNode(True)
-            delete, lnodes = self._fillNodeTemplate(newnode, dictionary)
+            delete = False
+            if self.plans[counter] != None:
+                delete, lnodes = self._fillNodePlan(newnode, self.plans[counter], dictionary)
             if not delete :
-                self.parents[counter].appendChild(newnode)
+                newnodes.append((self.parents[counter], newnode))
+        return newnodes
+
+
+    def render(self, data):
+        """
+        It returns a new root element of the template filled with data, the
+        template and the current XML are not changed. Useful to fill the same
+        template many times without parsing it again.
+
+        :Parameters:
+            -`data`: dictionary with data for the nodes of template.
+        """
+        if self.templateplan == None:
+            self.templateplan = (self._planNodeTemplate(self.templatedom), )
+        node = self.templatedom.cloneNode(True)
+        plan = self.templateplan[0]
+        if plan != None:
+            dictionary = self._dictionary(data)
+            delete, lnodes = self._fillNodePlan(node, plan, dictionary)
+        return node
+
+
+    def renderStrings(self, data, addindent=u"", newl=u"", lwhere=[]):
+        """
+        Like "renderData", but the new nodes are returned as lists of strings, as
+        "writexml" of the document would write them with `addindent` and `newl`.
+        The nodes are compiled once as "sxmlstring.SXMLStringTemplate", no DOM is
+        used to fill them. It returns a list of tuples (parent node, strings).
+
+        :Parameters:
+            -`data`: dictionary with data for new XML nodes.
+            -`addindent`: indentation of each level.
+            -`newl`: newline string.
+            -`lwhere`: list of nodes which will be filled with data.
+        """
+        if not lwhere:
+            lwhere = list(self.templates)
+        dictionary = self._dictionary(data)
+        newnodes = []
+        for counter in xrange(0, self.templatecounter):
+            if self.templates[counter] not in lwhere:
+                continue
+            key = (counter, addindent, newl)
+            try:
+                stemplate = self.stringtemplates[key]
+            except KeyError:
+                stemplate = self._compileString(self.templates[counter],
+                    self.parents[counter], addindent, newl)
+                self.stringtemplates[key] = stemplate
+            if stemplate != None:
+                strings = stemplate.render(dictionary)
+            else:
+                strings = self._renderNodeStrings(counter, dictionary, addindent, newl)
+            if strings != None:
+                newnodes.append((self.parents[counter], strings))
+        return newnodes
+
+
+    def renderChildren(self, data):
+        """
+        Like "render", but it returns a list of strings of the children of the
+        filled root element, with the string backend. Joined, they are the same
+        as the "toxml" of each child.
+
+        :Parameters:
+            -`data`: dictionary with data for the nodes of template.
+        """
+        try:
+            stemplate = self.stringtemplates[None]
+        except KeyError:
+            try:
+                stemplate = sxmlstring.SXMLStringTemplate(self.templatedom)
+            except exceptions.SXMLTemplateErrorCompile:
+                stemplate = None
+            self.stringtemplates[None] = stemplate
+        if stemplate == None:
+            return [child.toxml() for child in self.render(data).childNodes]
+        return stemplate.renderChildren(self._dictionary(data))
+
+
+    def _compileString(self, node, parent, addindent, newl):
+        """
+        It compiles a repeatable node with the indentation of its place in the
+        document. None if it cannot be compiled.
+        """
+        indent = u""
+        while parent.nodeType == xml.dom.minidom.Node.ELEMENT_NODE:
+            indent += addindent
+            parent = parent.parentNode
+        try:
+            return sxmlstring.SXMLStringTemplate(node, indent, addindent, newl)
+        except exceptions.SXMLTemplateErrorCompile:
+            return None
+
+
+    def _renderNodeStrings(self, counter, dictionary, addindent, newl):
+        """
+        DOM version of "renderStrings" for a node.
+        """
+        newnode = self.templates[counter].cloneNode(True)
+        delete = False
+        if self.plans[counter] != None:
+            delete, lnodes = self._fillNodePlan(newnode, self.plans[counter], dictionary)
+        if delete:
+            return None
+        indent = u""
+        parent = self.parents[counter]
+        while parent.nodeType == xml.dom.minidom.Node.ELEMENT_NODE:
+            indent += addindent
+            parent = parent.parentNode
+        writer = StringIO.StringIO()
+        newnode.writexml(writer, indent, addindent, newl)
+        newnode.unlink()
+        return [writer.getvalue()]
 
 
     def getDom(self, template=False):
@@ -234,6 +385,15 @@ class SXMLTemplate:
             return self.dom
 
 
+    def _dictionary(self, data):
+        """
+        TemplateDict with data, the same object if data is a TemplateDict.
+        """
+        if isinstance(data, SXMLTemplate.TemplateDict):
+            return data
+        return self.TemplateDict(data)
+
+
     def _open(self, source):
         """
         URI, filename, or string --> stream
@@ -321,6 +481,83 @@ class SXMLTemplate:
             return False, []
 
 
+    def _planNodeTemplate(self, node):
+        """
+        It finds the gaps of a XML Node to fill them faster in its copies.
+
+        The plan is "None" if there is nothing to fill in the node and its children, 
+        otherwise it is a tuple with the attributes to fill, the list of children 
+        (position, plan) to fill ("None" if node has not children) and if data 
+        has to be filled. Anything with a "%" is filled, like "_fillNodeTemplate" does.
+        """
+        attributes = []
+        children = None
+        data = False
+        if node.nodeType == xml.dom.minidom.Node.ELEMENT_NODE:
+            if node.hasAttributes():
+                for attribute in node.attributes.keys():
+                    if '%' in node.getAttribute(attribute):
+                        attributes.append(attribute)
+        if node.hasChildNodes():
+            children = []
+            for position, child in enumerate(node.childNodes):
+                plan = self._planNodeTemplate(child)
+                if plan != None:
+                    children.append((position, plan))
+            if not children:
+                if not attributes:
+                    return None
+        else:
+            if node.nodeType == xml.dom.minidom.Node.TEXT_NODE \
+                or node.nodeType == xml.dom.minidom.Node.CDATA_SECTION_NODE \
+                or node.nodeType == xml.dom.minidom.Node.COMMENT_NODE :
+                data = '%' in node.data
+            if not attributes and not data:
+                return None
+        return (attributes, children, data)
+
+
+    def _fillNodePlan(self, node, plan, dictionary):
+        """
+        The same as "_fillNodeTemplate" but only with the gaps of the plan of the node
+        (see "_planNodeTemplate"). Node must be a copy of the planned one.
+        """
+        attributes, children, data = plan
+        for attribute in attributes:
+            try:
+                value = node.getAttribute(attribute) % dictionary
+            except UserWarning:
+                node.removeAttribute(attribute)
+            else:
+                node.setAttribute(attribute, value)
+        if children != None:
+            delnodes = False
+            lnodes = []
+            remnodes = []
+            childnodes = node.childNodes
+            for position, childplan in children:
+                delnode, lnode = self._fillNodePlan(childnodes[position], childplan, dictionary)
+                if delnode and lnode:
+                    remnodes += lnode
+                    delnodes = False
+                    lnodes = []
+                elif delnode:
+                    lnodes.append(node)
+                    delnodes = True
+            for child in remnodes:
+                node.removeChild(child)
+            return delnodes, lnodes
+        if data:
+            try:
+                value = node.data % dictionary
+                node.data = value
+            except UserWarning:
+                return True, []
+            except:
+                pass
+        return False, []
+
+
     def _delWhiteNodes(self, node):
         """
         It removes all of the whitespace-only text decendants of a DOM node.
@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright © 2008 Jose Riguera Lopez <jriguera@gmail.com>
+#
+import sys
+import os
+import os.path
+import re
+import random
+import StringIO
+import xml.dom
+import xml.dom.minidom
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+import sXMLTemplate
+from sXMLTemplate import sxmltemplate
+
+# #####################################################
+# Conformance of DOM plans and string backend (sxmlstring)
+# with the previous DOM fill
+# #####################################################
+
+CASES = [
+    # (template, repeatable node)
+    ('<a><b x="%(X)s" y="1">%(T)s</b></a>', 'a.b'),
+    ('<a><b><c>%(T|)s</c><d>static</d></b></a>', 'a.b'),
+    ('<a><b><c>%(T|)s</c></b></a>', 'a.b'),
+    ('<a><b><c>%(T|)s<e>%(U|)s</e></c><d>%(U|)s</d></b></a>', 'a.b'),
+    ('<a><b><c><e>%(U|)s</e>%(T|)s</c></b></a>', 'a.b'),
+    ('<a><b z="%(Z|)s" y="%(Y|y)s" x="%%">50% &amp; &lt;%(T|t)s&gt;</b></a>', 'a.b'),
+    ('<a><b><![CDATA[<p>%(T|)s</p>]]><!--%(C|c)s--></b></a>', 'a.b'),
+    ('<a><f><b><c/><d>%(T|-)s</d><!-- static --></b></f></a>', 'a.f.b'),
+]
+DATA = [
+    {},
+    {'X': 1, 'T': u'caf\xe9 & <tea>', 'U': 'u', 'Z': '"z"', 'C': 'comment'},
+    {'T': '', 'U': 'u'},
+    {'T': 't', 'U': ''},
+    {'C': 'a--b', 'T': ']]>'},
+]
+TEXTS = ['abc', '%(A)s', '%(B|)s', '%(C|x)s', '50%', '%%', '&amp; %(A|&lt;)s', '%(E|)s']
+INDENTS = [(u"", u""), (u"   ", u"\n"), (u"\t", u"\r\n")]
+
+
+def randomnode(depth):
+    tag = random.choice('pqrs')
+    attrs = ''.join(' a%d="%s"' % (i, random.choice(TEXTS)) for i in range(random.randint(0, 2)))
+    if depth == 0 or random.random() < 0.3:
+        body = random.choice(TEXTS + ['', '<![CDATA[%s]]>' % random.choice(TEXTS),
+            '<!--%s-->' % random.choice(['c', '%(A)s', '%(E|)s'])])
+    else:
+        body = ''.join(randomnode(depth - 1) for i in range(random.randint(1, 3)))
+    return '<%s%s>%s</%s>' % (tag, attrs, body, tag)
+
+
+def result(function, *args):
+    try:
+        return function(*args)
+    except Exception as e:
+        return e.__class__
+
+
+# Previous implementation (before the fill plans and the string backend),
+# the reference for all of them.
+
+class BaselineDict(dict):
+    def __getitem__(self, key):
+        try:
+            k, default = key.split(sxmltemplate.SXMLTemplate.separatorKey, 1)
+        except ValueError:
+            k = key.split(sxmltemplate.SXMLTemplate.separatorKey, 1)[0]
+            default = sxmltemplate.SXMLTemplate.defaultValue
+        random = sxmltemplate.SXMLTemplate.magic
+        value = self.get(k, default + random)
+        if value == sxmltemplate.SXMLTemplate.deletetag + random:
+            raise UserWarning
+        return self.get(k, default)
+
+
+def baselinefill(node, dictionary):
+    if node.nodeType == xml.dom.minidom.Node.ELEMENT_NODE:
+        if node.hasAttributes():
+            for attribute in node.attributes.keys():
+                try:
+                    value = node.getAttribute(attribute) % dictionary
+                except UserWarning:
+                    node.removeAttribute(attribute)
+                else:
+                    node.setAttribute(attribute, value)
+    if node.hasChildNodes():
+        delnodes = False
+        lnodes = []
+        remnodes = []
+        for child in node.childNodes:
+            delnode, lnode = baselinefill(child, dictionary)
+            if delnode and lnode:
+                remnodes += lnode
+                delnodes = False
+                lnodes = []
+            elif delnode:
+                lnodes.append(node)
+                delnodes = True
+        for child in remnodes:
+            node.removeChild(child)
+        return delnodes, lnodes
+    else:
+        if node.nodeType == xml.dom.minidom.Node.TEXT_NODE \
+            or node.nodeType == xml.dom.minidom.Node.CDATA_SECTION_NODE \
+            or node.nodeType == xml.dom.minidom.Node.COMMENT_NODE :
+            try:
+                value = node.data % dictionary
+                node.data = value
+            except UserWarning:
+                return True, []
+            except:
+                pass
+        return False, []
+
+
+def baselinedata(template, data):
+    # old "setData" without appending the new nodes
+    dictionary = BaselineDict(data)
+    newnodes = []
+    for counter in xrange(0, template.templatecounter):
+        newnode = template.templates[counter].cloneNode(True)
+        delete, lnodes = baselinefill(newnode, dictionary)
+        if not delete:
+            newnodes.append((template.parents[counter], newnode))
+    return newnodes
+
+
+def writexml(nodes, addindent, newl):
+    strings = []
+    for parent, node in nodes:
+        # indentation of the node in the document
+        indent = u""
+        while parent.nodeType == xml.dom.Node.ELEMENT_NODE:
+            indent += addindent
+            parent = parent.parentNode
+        writer = StringIO.StringIO()
+        node.writexml(writer, indent, addindent, newl)
+        strings.append(writer.getvalue())
+    return strings
+
+
+def baseline(template, data, addindent, newl):
+    return writexml(baselinedata(template, data), addindent, newl)
+
+
+def dom(template, data, addindent, newl):
+    return writexml(template.renderData(data), addindent, newl)
+
+
+def string(template, data, addindent, newl):
+    return [u''.join(s) for parent, s in template.renderStrings(data, addindent, newl)]
+
+
+def baselinedocument(template, data):
+    for parent, node in baselinedata(template, data):
+        parent.appendChild(node)
+    return template.getDom().toxml()
+
+
+def document(template, data):
+    template.setData(data)
+    return template.getDom().toxml()
+
+
+def baselinechildren(template, data):
+    # old "KmlData" descriptions: root info of the template and its children
+    node = template.getDom(True).cloneNode(True)
+    baselinefill(node, BaselineDict(data))
+    return [child.toxml() for child in node.childNodes]
+
+
+def children(template, data):
+    return [child.toxml() for child in template.render(data).childNodes]
+
+
+def stringchildren(template, data):
+    return u''.join(template.renderChildren(data))
+
+
+def compare(name, source, data, expected, got):
+    if expected != got:
+        print "ERROR %s %s %s:\n  baseline %r\n  got      %r" % \
+            (name, source, data, expected, got)
+        return 1
+    return 0
+
+
+def check(source, redo, datas=DATA + [{'A': 'a', 'B': 'b'}, {'A': '', 'E': 'e', 'C': '<c>'}]):
+    errors = 0
+    for data in datas:
+        if redo:
+            for addindent, newl in INDENTS:
+                template = sxmltemplate.SXMLTemplate(source, [redo])
+                expected = result(baseline, template, data, addindent, newl)
+                got = result(dom, template, data, addindent, newl)
+                errors += compare("DOM %r" % addindent, source, data, expected, got)
+                got = result(string, template, data, addindent, newl)
+                errors += compare("string %r" % addindent, source, data, expected, got)
+            expected = result(baselinedocument, sxmltemplate.SXMLTemplate(source, [redo]), data)
+            got = result(document, sxmltemplate.SXMLTemplate(source, [redo]), data)
+            errors += compare("document", source, data, expected, got)
+        template = sxmltemplate.SXMLTemplate(source)
+        expected = result(baselinechildren, template, data)
+        got = result(children, template, data)
+        errors += compare("children", source, data, expected, got)
+        if isinstance(expected, list):
+            expected = u''.join(expected)
+        got = result(stringchildren, template, data)
+        errors += compare("string children", source, data, expected, got)
+    return errors
+
+
+def shipped():
+    """
+    Templates of PhotoPlace (share/templates) with data for all of their keys,
+    with empty values (deleted with "deletetag") and without them.
+    """
+    errors = 0
+    checked = 0
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+        "..", "..", "..", "share", "templates")
+    for directory, dirnames, filenames in os.walk(path):
+        for filename in sorted(filenames):
+            source = os.path.join(directory, filename)
+            redo = None
+            if filename.endswith(".kml"):
+                redo = 'kml.Document.Folder.Placemark'
+            keys = set(re.findall(r'%\(([^)|]+)', open(source).read()))
+            datas = [{}, dict.fromkeys(keys, u''), dict.fromkeys(keys, u'caf\xe9 & <tea>')]
+            random.seed(filename)
+            for counter in xrange(10):
+                datas.append(dict((k, random.choice([u'', u'a', u'50%', u'<b>']))
+                    for k in keys if random.random() < 0.5))
+            errors += check(source, redo, datas)
+            checked += 1
+    return checked, errors
+
+
+def test(num_random=2000):
+    print "\n* SXMLTemplate string backend conformance\n"
+    sxmltemplate.SXMLTemplate.deletetag = ""
+    errors = 0
+    checked = 0
+    for source, redo in CASES:
+        errors += check(source, redo)
+        checked += 1
+    shippedchecked, shippederrors = shipped()
+    print "%d shipped templates checked, %d errors" % (shippedchecked, shippederrors)
+    checked += shippedchecked
+    errors += shippederrors
+    random.seed(num_random)
+    for counter in xrange(num_random):
+        source = '<r><i>%s</i></r>' % randomnode(4)
+        try:
+            sxmltemplate.SXMLTemplate(source)
+        except sXMLTemplate.SXMLTemplateError:
+            continue
+        errors += check(source, 'r.i')
+        checked += 1
+    print "%d templates checked, %d errors" % (checked, errors)
+    print "\n* End Tests!\n"
+    return errors
+
+
+if __name__ == "__main__":
+    num_random = 2000
+    if len(sys.argv) > 1:
+        num_random = int(sys.argv[1])
+    sys.exit(1 if test(num_random) else 0)
+
+#EOF
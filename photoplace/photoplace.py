@@ -38,6 +38,7 @@ __copyright__ ="(c) Jose Riguera, 2010-2020"
 import os
 import shutil
 import imp
+import multiprocessing
 import optparse
 import ConfigParser
 import gettext
@@ -265,6 +266,8 @@ def program(args=sys.argv):
 
 
 if __name__ == "__main__":
+    # Process pools (CopyWorkers) in frozen (py2exe) programs
+    multiprocessing.freeze_support()
     # Main program
     program(sys.argv)
     sys.exit(0)